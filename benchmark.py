@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+AUTHOR:   Joshua W. Johnstone
+NAME:     benchmark.py
+PURPOSE:  Measure the speed of the Monopoly simulator
+
+Each benchmark times one hot path on fixed seeds and reports a throughput
+(operations per second, higher is better). Results can be saved as a
+baseline and later runs checked against it: the check fails (exit status 1)
+if any benchmark is slower than the baseline by more than the threshold.
+Timings depend on the machine, so no baseline is shipped: record one with 
+--save before the first --check, which otherwise stops with an error.
+
+Usage:
+    python benchmark.py                       run every benchmark
+    python benchmark.py play take_turn        run some of them
+    python benchmark.py --save                save the results as the baseline
+    python benchmark.py --check               compare with the baseline
+    python benchmark.py --check --threshold 0.2
+    python benchmark.py --memory              also measure memory per game
+    python benchmark.py --scaling             find_trades/play vs player count
+    python benchmark.py --threads             games/s vs number of threads
+    python benchmark.py --batch               games/s of BatchGame vs simulate
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, 'benchmark_baseline.json')
+THRESHOLD = 0.10
+
+def _players(thresholds=(50, 200, 200, 500)):
+    import monopoly
+    return [monopoly.Player(name=f'player{i+1}', cash_threshold=t)
+            for i, t in enumerate(thresholds)]
+
+def _game(seed, rounds=0, n_players=4):
+    '''
+    Returns a game of n_players started from 'seed' and played for up to 
+    'rounds' rounds.
+    '''
+    import monopoly
+    thresholds = (50, 200, 200, 500) * (-(-n_players // 4))
+    game = monopoly.Game(players=_players(thresholds[:n_players]))
+    game.reset(seed=seed)
+    for _ in range(rounds):
+        if game.player_count > 1:
+            game.play_round()
+    return game
+
+#%% Benchmarks. Each returns (operations, seconds).
+
+def bench_startup(n=5):
+    '''
+    Times 'import monopoly' followed by Game() in a fresh interpreter, which is
+    what every new worker process pays before it simulates anything.
+    '''
+    code = ('import time; t = time.perf_counter(); '
+            'import monopoly; monopoly.Game(); '
+            'print(time.perf_counter() - t)')
+    seconds = 0.0
+    for _ in range(n):
+        out = subprocess.run([sys.executable, '-c', code], cwd=HERE,
+                             capture_output=True, text=True, check=True)
+        seconds += float(out.stdout)
+    return n, seconds
+
+def bench_build_board(n=2000):
+    import monopoly
+    monopoly.board_spec()
+    t = time.perf_counter()
+    for _ in range(n):
+        monopoly.build_board()
+    return n, time.perf_counter() - t
+
+def bench_take_turn(n_games=50, rounds=100):
+    '''
+    Times Player.take_turn alone over the first rounds of n_games games.
+    '''
+    turns, seconds = 0, 0.0
+    clock = time.perf_counter
+    for seed in range(n_games):
+        game = _game(seed)
+        for _ in range(rounds):
+            for player in game.players:
+                if player.bankrupt:
+                    continue
+                t = clock()
+                player.take_turn()
+                seconds += clock() - t
+                turns += 1
+                game.find_trades(player)
+            if game.player_count == 1:
+                break
+    return turns, seconds
+
+def bench_play_round(n_games=50, rounds=100):
+    n, seconds = 0, 0.0
+    for seed in range(n_games):
+        game = _game(seed)
+        t = time.perf_counter()
+        for _ in range(rounds):
+            if game.player_count == 1:
+                break
+            game.play_round()
+            n += 1
+        seconds += time.perf_counter() - t
+    return n, seconds
+
+def bench_find_trades(n_games=50, rounds=20, calls=20, n_players=4):
+    '''
+    Times Game.find_trades on mid-game positions, after 'rounds' rounds.
+    '''
+    n, seconds = 0, 0.0
+    for seed in range(n_games):
+        game = _game(seed, rounds, n_players)
+        t = time.perf_counter()
+        for _ in range(calls):
+            for player in game.active_players:
+                game.find_trades(player)
+                n += 1
+        seconds += time.perf_counter() - t
+    return n, seconds
+
+def bench_cover_debt(n=500):
+    '''
+    Times Player.cover_debt for a player who owns the whole board, with two
+    houses on every property, and owes more than all of it is worth: every
+    railroad and utility is mortgaged, a house is sold from every property,
+    every property is mortgaged and then the player goes bankrupt.
+    '''
+    seconds = 0.0
+    for seed in range(n):
+        game = _game(seed)
+        debtor, creditor = game.players[:2]
+        for space in game.board.values():
+            if space.kind in ('property', 'railroad', 'utility'):
+                space.owner = debtor
+                if space.kind == 'property':
+                    space.houses = 2
+                    game.board.houses -= 2
+        debtor.cash = 0
+        t = time.perf_counter()
+        debtor.cover_debt(10**6, creditor)
+        seconds += time.perf_counter() - t
+    return n, seconds
+
+def bench_build(n=500):
+    '''
+    Times Player.develop for a rich player who owns the whole board with no
+    houses yet, one property of each color mortgaged: the mortgages are 
+    paid off and every monopoly is built up to hotels, until the bank runs 
+    out of houses.
+    '''
+    seconds = 0.0
+    for seed in range(n):
+        game = _game(seed)
+        player = game.players[0]
+        for color, props in game.board.color_groups.items():
+            for space in props:
+                if space.kind in ('property', 'railroad', 'utility'):
+                    space.owner = player
+            if props[0].kind == 'property':
+                props[0].mortgaged = True
+        player.cash = 10**6
+        t = time.perf_counter()
+        player.develop()
+        seconds += time.perf_counter() - t
+    return n, seconds
+
+def bench_restore(n=2000):
+    '''
+    Times Game.restore of a snapshot taken after 10 rounds, with re-seeding,
+    as done before every rollout.
+    '''
+    game = _game(0, rounds=10)
+    snapshot = game.snapshot()
+    t = time.perf_counter()
+    for seed in range(n):
+        game.restore(snapshot, seed=seed)
+    return n, time.perf_counter() - t
+
+def bench_play(n_games=200, seed=0):
+    '''
+    Times Game.play() on the games game_seed(seed, n) for n < n_games.
+    '''
+    import monopoly
+    game = monopoly.Game(players=_players())
+    t = time.perf_counter()
+    for n in range(n_games):
+        game.play(seed=monopoly.game_seed(seed, n))
+    return n_games, time.perf_counter() - t
+
+BENCHMARKS = {
+    'startup':     (bench_startup, 'starts'),
+    'build_board': (bench_build_board, 'boards'),
+    'take_turn':   (bench_take_turn, 'turns'),
+    'play_round':  (bench_play_round, 'rounds'),
+    'find_trades': (bench_find_trades, 'calls'),
+    'cover_debt':  (bench_cover_debt, 'calls'),
+    'build':       (bench_build, 'calls'),
+    'restore':     (bench_restore, 'restores'),
+    'play':        (bench_play, 'games'),
+    }
+
+def run(names=None, repeat=5):
+    '''
+    Runs the named benchmarks (all by default) 'repeat' times each.
+
+    Returns
+    -------
+    results : dict
+        Maps benchmark name to a dict with the unit and the best and median
+        throughput (operations per second) over the repeats.
+
+    '''
+    results = {}
+    for name in names or BENCHMARKS:
+        func, unit = BENCHMARKS[name]
+        rates = []
+        for _ in range(repeat):
+            ops, seconds = func()
+            rates.append(ops / seconds)
+        results[name] = {'unit': unit,
+                         'best': max(rates),
+                         'median': statistics.median(rates)}
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD):
+    '''
+    Compares the best throughput of each benchmark with a baseline, and
+    prints the change.
+
+    Returns
+    -------
+    regressions : list of str
+        Names of the benchmarks that are slower than the baseline by more
+        than 'threshold' (a fraction).
+
+    '''
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result['best'] / baseline[name]['best'] - 1
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<12} {change:+7.1%} vs baseline{flag}')
+    return regressions
+
+def report(results):
+    for name, result in results.items():
+        unit = result['unit'] + '/s'
+        print(f'{name:<12} best {result["best"]:12,.0f} {unit:<9} '
+              f'median {result["median"]:12,.0f} {unit}')
+
+def bench_scaling(player_counts=(2, 3, 4, 6, 8), n_games=50, rounds=100):
+    '''
+    Measures how the cost of a turn grows with the number of players: the
+    turn rate of play_round (whole turns, trade search included) and of 
+    find_trades alone, in the first 'rounds' rounds of n_games games.
+
+    Returns
+    -------
+    rates : dict
+        Maps player count to (turns per second, find_trades calls per 
+        second).
+
+    '''
+    import monopoly
+    rates = {}
+    for n_players in player_counts:
+        turns, seconds = 0, 0.0
+        trade_calls, trade_seconds = 0, 0.0
+        for seed in range(n_games):
+            game = _game(seed, n_players=n_players)
+            game.collect_stats = True
+            game.reset(seed=seed)
+            for _ in range(rounds):
+                if game.player_count == 1:
+                    break
+                game.play_round()
+            stats = game.stats
+            turns += stats.counts['turns']
+            seconds += stats.times['take_turn'] + stats.times['find_trades']
+            trade_calls += stats.calls['find_trades']
+            trade_seconds += stats.times['find_trades']
+        rates[n_players] = (turns / seconds, trade_calls / trade_seconds)
+    return rates
+
+def bench_threads(thread_counts=(1, 2, 4, 8), n_games=400, seed=0):
+    '''
+    Measures the throughput of simulate(backend='thread') against the number
+    of threads, all playing the same n_games games. The games only run in 
+    parallel on a free-threaded build of Python; with the GIL the rate stays
+    flat (or drops a little) as threads are added.
+
+    Returns
+    -------
+    rates : dict
+        Maps thread count to games per second.
+
+    '''
+    import monopoly
+    monopoly.board_spec()
+    players = _players()
+    rates = {}
+    for workers in thread_counts:
+        t = time.perf_counter()
+        monopoly.simulate(players, n_games, workers=workers, seed=seed,
+                          backend='thread')
+        rates[workers] = n_games / (time.perf_counter() - t)
+    return rates
+
+def bench_batch(n_games=50000, widths=(1000, 4000, 8192), seed=0):
+    '''
+    Measures the throughput of monopoly_batch.BatchGame for a few slot
+    widths, against that of simulate() on a single worker playing the same
+    kind of games. Needs numpy.
+
+    Returns
+    -------
+    rates : dict
+        Maps 'simulate' and each width to games per second.
+
+    '''
+    import monopoly
+    import monopoly_batch
+    thresholds = (50, 200, 200, 500)
+    monopoly.board_spec()
+    n_scalar = n_games // 20
+    t = time.perf_counter()
+    monopoly.simulate(_players(thresholds), n_scalar, workers=1, seed=seed)
+    rates = {'simulate': n_scalar / (time.perf_counter() - t)}
+    for width in widths:
+        t = time.perf_counter()
+        monopoly_batch.BatchGame(n_games, thresholds, seed=seed,
+                                 width=width).play()
+        rates[width] = n_games / (time.perf_counter() - t)
+    return rates
+
+def bench_memory(n_games=500, rounds=30, seed=0):
+    '''
+    Keeps n_games games alive in one process, each played for 'rounds'
+    rounds, and measures the memory they hold, as when games are kept around
+    for rollouts.
+
+    Returns
+    -------
+    bytes_per_game : float
+    objects_per_game : float
+        Number of objects tracked by the garbage collector, per game.
+
+    '''
+    import monopoly
+    monopoly.board_spec()   # shared by all games, so keep it out of the count
+    gc.collect()
+    n_objects = len(gc.get_objects())
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    games = [_game(monopoly.game_seed(seed, n), rounds) for n in range(n_games)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    objects = len(gc.get_objects()) - n_objects
+    del games
+    return used / n_games, objects / n_games
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the simulator.')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f'benchmarks to run (default: all of '
+                             f'{", ".join(BENCHMARKS)})')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='baseline file (default: benchmark_baseline.json)')
+    parser.add_argument('--save', action='store_true',
+                        help='save the results as the baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='fail if slower than the baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed slowdown, as a fraction (default 0.10)')
+    parser.add_argument('--memory', action='store_true',
+                        help='also measure the memory held by live games')
+    parser.add_argument('--scaling', action='store_true',
+                        help='also measure turn cost against player count')
+    parser.add_argument('--threads', action='store_true',
+                        help='also measure game throughput against threads')
+    parser.add_argument('--batch', action='store_true',
+                        help='also compare BatchGame with simulate()')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+    if args.check:
+        # Read the baseline first, rather than fail after the benchmarks ran
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            parser.error(f'no baseline at {args.baseline}: run with --save '
+                         f'first to record one on this machine')
+
+    results = run(args.names, args.repeat)
+    report(results)
+    if args.memory:
+        per_game, objects = bench_memory()
+        print(f'{"memory":<12} {per_game/1024:8.1f} KiB per game, '
+              f'{objects:.0f} objects')
+    if args.scaling:
+        for n_players, (turns, trades) in bench_scaling().items():
+            print(f'{n_players} players    {turns:12,.0f} turns/s   '
+                  f'find_trades {trades:12,.0f} calls/s')
+    if args.threads:
+        gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+        print(f'threads (GIL {"enabled" if gil else "disabled"}, '
+              f'{os.cpu_count()} CPUs)')
+        rates = bench_threads()
+        for workers, rate in rates.items():
+            print(f'{workers:>2} threads   {rate:12,.0f} games/s   '
+                  f'speedup {rate / rates[min(rates)]:5.2f}x')
+    if args.batch:
+        rates = bench_batch()
+        for name, rate in rates.items():
+            label = name if name == 'simulate' else f'batch {name}'
+            print(f'{label:<12} {rate:12,.0f} games/s   '
+                  f'speedup {rate / rates["simulate"]:5.2f}x')
+    if args.check:
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
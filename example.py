@@ -8,48 +8,202 @@ PURPOSE:  Test / show an example of Monopoly simulator
 
 import monopoly
 
+# Every cell that does work runs under the main guard: simulate() and the 
+# other parallel runners start worker processes that import this module, and
+# with the spawn or forkserver start methods anything left at module level
+# would run again in each of them. Classes the workers need, like NoHouses 
+# below, stay at module level.
+
 #%% Define players
-player1 = monopoly.Player(name='Josh', cash_threshold=50)
-player2 = monopoly.Player(name='Austin')
-player3 = monopoly.Player(name='Zander')
-player4 = monopoly.Player(name='Scott', cash_threshold=500)
+
+if __name__ == '__main__':
+    player1 = monopoly.Player(name='Josh', cash_threshold=50)
+    player2 = monopoly.Player(name='Austin')
+    player3 = monopoly.Player(name='Zander')
+    player4 = monopoly.Player(name='Scott', cash_threshold=500)
 
 
 #%% Configure game
-game = monopoly.Game(players=[player1, player2, player3, player4], debug=True)
 
-for player in game.players:
-    print(player.name)
+if __name__ == '__main__':
+    game = monopoly.Game(players=[player1, player2, player3, player4], debug=True)
+
+    for player in game.players:
+        print(player.name)
 
 
 #%% Play one round
-game.reset()
-game.play_round()
+
+if __name__ == '__main__':
+    game.reset()
+    game.play_round()
 
 
 #%% Play a whole game
-game.debug = True
-game.play()
+
+if __name__ == '__main__':
+    game.debug = True
+    game.play()
 
 
 #%% Print the board
-print(game.board)
-print(f'Winner is {game.winner.name}!')
+
+if __name__ == '__main__':
+    print(game.board)
+    print(f'Winner is {game.winner.name}!')
 
 
 #%% Simulate many games
 
-N = 20
-winners = []
-game_lengths = []
+if __name__ == '__main__':
+    N = 20
+    winners = []
+    game_lengths = []
 
-for n in range(N):
-    game.play()
-    winners.append(game.winner.name)
-    game_lengths.append(game.rounds)
+    for n in range(N):
+        game.play()
+        winners.append(game.winner.name)
+        game_lengths.append(game.rounds)
+
+    for player in game.players:
+        print(f'{player.name} won {winners.count(player.name)} out of {len(winners)} games.')
+
+    print(f'Average length of game is {round(sum(game_lengths)/len(game_lengths))} rounds.')
+
+
+#%% Simulate many games in parallel, on all cores
+
+if __name__ == '__main__':
+    results = monopoly.simulate(game.players, n_games=1000, seed=42)
+    print(results)
+
+
+#%% The same games in threads of this process: the same results, and in
+# parallel on a free-threaded build of Python
+
+if __name__ == '__main__':
+    results = monopoly.simulate(game.players, n_games=1000, seed=42,
+                                backend='thread')
+    print(results)
+
+
+#%% Where does the time go? Per-phase counters, and a cProfile run
+
+if __name__ == '__main__':
+    results = monopoly.simulate(game.players, n_games=200, seed=42, 
+                                collect_stats=True)
+    print(results.stats)
+    game.debug = False
+    monopoly.profile_run(game.play, seed=42)
+
+
+#%% Evaluate a position with rollouts: snapshot it, then restore and play it
+# out many times with different dice
+
+from collections import Counter
+
+if __name__ == '__main__':
+    game.debug = False
+    game.reset(seed=7)
+    for _ in range(20):
+        game.play_round()
+    position = game.snapshot()
+
+    wins = Counter()
+    for k in range(200):
+        game.restore(position, seed=k)
+        game.play_out()
+        wins[game.winner.name if game.winner else 'draw'] += 1
+    print(wins)
+
+
+#%% Simulate many games at once with the vectorized engine (requires NumPy)
+
+import monopoly_batch
+
+if __name__ == '__main__':
+    batch = monopoly_batch.BatchGame(n_games=5000, cash_thresholds=(50, 200, 200, 500), seed=42)
+    print(batch.play().results(names=[p.name for p in game.players]))
+
+
+#%% Expected rent per opponent turn, from the Markov chain (requires NumPy):
+# level 4 is 3 houses on a property (railroads and utilities have no level 4)
+
+import monopoly_markov
+
+if __name__ == '__main__':
+    chain = monopoly_markov.markov_chain()
+    for name, rent in chain.ranking(level=4)[:10]:
+        print(f'{name:<25} ${rent:6.2f}')
+
+
+#%% Stream per-game records to a file (Arrow and Parquet need pyarrow)
+
+if __name__ == '__main__':
+    records = monopoly.iter_games(game.players, n_games=10000, seed=42, workers=4)
+    monopoly.write_games(records, 'games.csv')
+
+
+#%% Strategies: override some decisions, then play every seating of them
+
+class NoHouses(monopoly.Strategy):
+    def build(self, player):
+        pass
+
+if __name__ == '__main__':
+    strategies = [monopoly.Strategy(cash_threshold=50),
+                  monopoly.Strategy(cash_threshold=200),
+                  monopoly.Strategy(cash_threshold=500),
+                  NoHouses()]
+    print(monopoly.tournament(strategies, n_games=200, seed=42))
+
+
+#%% Is one strategy better than another? Plays only as many games as needed
+
+if __name__ == '__main__':
+    print(monopoly.compare(strategies[0], strategies[2], seed=42))
+
+
+#%% Host live games: one seat played by an agent over a local socket (here
+# a greedy one in the same process), the others by bots
+
+import asyncio
+import monopoly_host
+
+def greedy(prompt):
+    if prompt['decision'] == 'build':
+        return len(prompt['info']['plan'])
+    return True
+
+async def host_games(n_games=50):
+    host = monopoly_host.GameHost(timeout=0.1)
+    address, port = await host.start()
+    agent = asyncio.create_task(monopoly_host.run_agent('greedy', greedy, 
+                                                        port=port))
+    await host.agent('greedy')
+    bots = game.players[1:]
+    records = await asyncio.gather(*(host.play(['greedy', *bots], seed=n) 
+                                     for n in range(n_games)))
+    await host.close()
+    await agent
+    print(host)
+    wins = sum(record.winner == 0 for record in records)
+    print(f'greedy won {wins} out of {n_games} games.')
+
+if __name__ == '__main__':
+    asyncio.run(host_games())
+
+
+#%% A long simulation that can be interrupted: rerun this cell (or 
+# 'python monopoly_campaign.py campaign.ckpt') to continue where it stopped
 
-for player in game.players:
-    print(f'{player.name} won {winners.count(player.name)} out of {len(winners)} games.')
+import os
+import monopoly_campaign
 
-print(f'Average length of game is {round(sum(game_lengths)/len(game_lengths))} rounds.')
-    
+if __name__ == '__main__':
+    if os.path.exists('campaign.ckpt'):
+        campaign = monopoly_campaign.Campaign.resume('campaign.ckpt')
+    else:
+        campaign = monopoly_campaign.Campaign(game.players, 100000, 
+                                              'campaign.ckpt', seed=42)
+    print(campaign.run())
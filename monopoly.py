@@ -10,21 +10,96 @@ Objects:
     Property (Space)
     Utility (Space)
     Railroad (Space)
+    BoardSpec
     Board (dict)
+    Dice
+    Event (and one subclass per event type)
+    EventBus
+    ConsoleSink
+    RingBufferSink
+    FileSink
+    GameStats
+    Strategy
     Player
     Game
-    ChanceDeck (TODO)
-    CommunityChest (TODO)
+    GameSnapshot
+    GameRecord
+    Deck
+    ChanceDeck (Deck)
+    CommunityChest (Deck)
+    SimulationResults
+    TournamentResults
+    ComparisonResults
+
+Functions:
+    board_spec
+    build_board
+    read_board_data
+    compile_board
+    simulate
+    tournament
+    wilson_interval
+    compare
+    iter_games
+    write_games
+    read_games
+    profile_run
+
+Game endings:
+    By default a Game ends after 1000 rounds (max_rounds), or after a 
+    100-round window in which nothing changes (stalemate_rounds), as well as
+    when all but one player are bankrupt. Game.play() can therefore return 
+    without a bankruptcy: check Game.outcome (and GameRecord.outcome), which
+    is 'bankruptcy', 'max_rounds' or 'stalemate'. After a capped game the 
+    winner is the richest player, or nobody with end_rule='draw'. Pass 
+    max_rounds=None and stalemate_rounds=None to play until one player is 
+    left, as games did before these limits existed (such games may never 
+    end).
 """
 
-import pandas as pd
+import hashlib
+import math
+import os
 import random
-from collections import defaultdict
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+class _SpaceState():
+    '''
+    Holds the mutable state (owner, houses, mortgaged) of a Space that has not
+    been placed on a Board yet, laid out like a one-space Board.
+    '''
+    __slots__ = ('owners', 'house_counts', 'mortgaged', 'rents', 'version', 
+                 'owner_changes')
+    
+    def __init__(self):
+        self.owners = [None]
+        self.house_counts = [0]
+        self.mortgaged = [False]
+        self.rents = [0]
+        self.version = 0
+        self.owner_changes = 0
+        
+    # Rents are only tracked once the space is on a Board
+    def update_rent(self, index):
+        pass
+    
+    def update_group_rents(self, index):
+        pass
 
 class Space():
     '''
     Object representing a generic space on the game board.
+    
+    The mutable state of a space (owner, houses, mortgaged) is not stored on 
+    the space itself but in the flat per-game arrays of the Board it belongs
+    to, at Space.index. The attributes below are views of those arrays.
+    
+    Spaces, like Players, use __slots__ and carry no instance __dict__.
     '''
+    __slots__ = ('_board', 'index', 'kind', 'color')
+    
     KINDS = ('go',
              'property',
              'chance',
@@ -39,8 +114,11 @@ class Space():
                  kind='go',
                  owner=None,
                  color=None):
+        self._board = _SpaceState()
+        self.index = 0
         self.kind = kind
         self.color = color
+        self.owner = owner
         
     def __str__(self):
         return f'{self.kind}'     
@@ -48,6 +126,37 @@ class Space():
     def __repr__(self):
         return (f'Space(kind={self.kind}, color={self.color})')
     
+    @property
+    def owner(self):
+        return self._board.owners[self.index]
+    @owner.setter
+    def owner(self, player):
+        # Keep the owners' ownership indexes in sync with the board, so that
+        # Player.owned never has to scan the board.
+        board = self._board
+        old = board.owners[self.index]
+        if old is not None:
+            old._remove_owned(self)
+        board.owners[self.index] = player
+        board.version += 1
+        board.owner_changes += 1
+        if player is not None:
+            player._add_owned(self)
+        board.update_group_rents(self.index)
+            
+    @property
+    def mortgaged(self):
+        return self._board.mortgaged[self.index]
+    @mortgaged.setter
+    def mortgaged(self, value):
+        board = self._board
+        if board.mortgaged[self.index] != value:
+            board.mortgaged[self.index] = value
+            owner = board.owners[self.index]
+            if owner is not None:
+                owner._mortgages += 1 if value else -1
+            board.update_rent(self.index)
+    
     def reset(self):
         self.owner = None
 
@@ -56,6 +165,10 @@ class Property(Space):
     Subclass of Space. Represents a colored property on the board.
     '''
     COLORS = ['brown','light_blue','pink','orange','red','yellow','green','blue']
+    GROUP_SIZES = {'brown':2,'light_blue':3,'pink':3,'orange':3,
+                   'red':3,'yellow':3,'green':3,'blue':2}
+    
+    __slots__ = ('name', 'price', 'rent_data', 'house_price')
     
     def __init__(self,
                  name=None,
@@ -66,17 +179,14 @@ class Property(Space):
                  houses=0,
                  house_price=0,
                  mortgaged=False):
+        super().__init__(kind='property', owner=owner, color=color)
         self.name = name
-        self.color = color
         self.price = price
-        self.owner = owner
         self.rent_data = rent_data
         self.houses = houses
         self.house_price = house_price
         self.mortgaged = mortgaged
         
-        super().__init__(kind='property', color=color)
-        
     def __str__(self):
         owner = 'None' if self.owner is None else self.owner.name
         mort = '(mortgaged)' if self.mortgaged else ''
@@ -99,34 +209,139 @@ class Property(Space):
     
     @property
     def houses(self):
-        return self._houses
+        return self._board.house_counts[self.index]
     @houses.setter
     def houses(self, value):
-        self._houses = value
+        board = self._board
+        owner = board.owners[self.index]
+        if owner is not None:
+            owner._count_buildings(board.house_counts[self.index], -1)
+            owner._count_buildings(value, 1)
+        board.house_counts[self.index] = value
+        board.version += 1
+        board.update_rent(self.index)
         
     def reset(self):
         self.owner = None
         self.houses = 0
         self.mortgaged = False
         
-class ChanceDeck():
-    def __init__(self):
-        pass #TODO
-    
-class CommunityChest():
+# A card is a (text, action, value) tuple; Player.draw_card carries out the
+# action. Destinations are board indexes; for 'railroad' and 'utility' the
+# value multiplies the rent (resp. the dice roll) owed to the owner, and for
+# 'repairs' it is the cost per house and per hotel.
+CHANCE_CARDS = (
+    ('Advance to Boardwalk', 'advance', 39),
+    ('Advance to Go', 'advance', 0),
+    ('Advance to Illinois Avenue', 'advance', 24),
+    ('Advance to St. Charles Place', 'advance', 11),
+    ('Advance to the nearest railroad, pay twice the rent', 'railroad', 2),
+    ('Advance to the nearest railroad, pay twice the rent', 'railroad', 2),
+    ('Advance to the nearest utility, pay ten times the roll', 'utility', 10),
+    ('Bank pays you a dividend of $50', 'collect', 50),
+    ('Get out of jail free', 'jail_free', None),
+    ('Go back 3 spaces', 'back', 3),
+    ('Go to jail', 'jail', None),
+    ('General repairs: $25 per house, $100 per hotel', 'repairs', (25, 100)),
+    ('Speeding fine: pay $15', 'pay', 15),
+    ('Take a trip to Reading Railroad', 'advance', 5),
+    ('Chairman of the board: pay each player $50', 'pay_each', 50),
+    ('Your building loan matures: collect $150', 'collect', 150),
+    )
+
+COMMUNITY_CHEST_CARDS = (
+    ('Advance to Go', 'advance', 0),
+    ('Bank error in your favor: collect $200', 'collect', 200),
+    ("Doctor's fee: pay $50", 'pay', 50),
+    ('From sale of stock you get $50', 'collect', 50),
+    ('Get out of jail free', 'jail_free', None),
+    ('Go to jail', 'jail', None),
+    ('Holiday fund matures: collect $100', 'collect', 100),
+    ('Income tax refund: collect $20', 'collect', 20),
+    ('It is your birthday: collect $10 from every player', 'collect_each', 10),
+    ('Life insurance matures: collect $100', 'collect', 100),
+    ('Pay hospital fees of $100', 'pay', 100),
+    ('Pay school fees of $50', 'pay', 50),
+    ('Receive a $25 consultancy fee', 'collect', 25),
+    ('Street repairs: $40 per house, $115 per hotel', 'repairs', (40, 115)),
+    ('Second prize in a beauty contest: collect $10', 'collect', 10),
+    ('You inherit $100', 'collect', 100),
+    )
+
+def _nearest_table(kinds, kind):
+    '''
+    Returns, for every board position, the index of the first space of the
+    given kind ahead of it (going around the board).
+    '''
+    n = len(kinds)
+    targets = [i for i, k in enumerate(kinds) if k == kind]
+    return tuple(min(targets, key=lambda t: (t - i - 1) % n) for i in range(n))
+
+class Deck():
+    '''
+    A deck of cards. The cards are a fixed tuple (CARDS) and the deck is a
+    list of their indexes, in shuffled order, read with a cursor: drawing a
+    card only moves the cursor, and the deck is reshuffled when the cursor
+    wraps around. A new deck is shuffled on its first draw.
+
+    The get out of jail free card stays with the player who drew it
+    (Deck.holder) until it is used; it is skipped while drawing until then.
+    '''
+    __slots__ = ('order', 'cursor', 'holder')
+
+    CARDS = ()
+
     def __init__(self):
-        pass #TODO
-    
+        self.order = list(range(len(self.CARDS)))
+        self.cursor = len(self.order)
+        self.holder = None
+
+    def __repr__(self):
+        return f'{type(self).__name__}(cursor={self.cursor}, holder={self.holder})'
+
+    def reset(self):
+        '''
+        Puts every card back, in the original order, to be shuffled on the
+        next draw.
+        '''
+        self.order[:] = range(len(self.CARDS))
+        self.cursor = len(self.order)
+        self.holder = None
+
+    def draw(self, rng):
+        '''
+        Returns the next card, reshuffling the deck with the random.Random
+        'rng' if all cards were drawn.
+        '''
+        order = self.order
+        while True:
+            if self.cursor == len(order):
+                rng.shuffle(order)
+                self.cursor = 0
+            card = self.CARDS[order[self.cursor]]
+            self.cursor += 1
+            if self.holder is None or card[1] != 'jail_free':
+                return card
+
+class ChanceDeck(Deck):
+    __slots__ = ()
+    CARDS = CHANCE_CARDS
+
+class CommunityChest(Deck):
+    __slots__ = ()
+    CARDS = COMMUNITY_CHEST_CARDS
+
 class Utility(Space):
     '''
     Subclass of Space. Represents Electric Company and Water Works
     '''
+    __slots__ = ('name', 'price')
+    
     def __init__(self, name=None, price=150, owner=None, mortgaged=False):
+        super().__init__(kind='utility', owner=owner)
         self.name = name
         self.price = price
-        self.owner = owner
         self.mortgaged = mortgaged
-        super().__init__(kind='utility')        
     def __str__(self):
         owner = 'None' if self.owner is None else self.owner.name
         mort = '(mortgaged)' if self.mortgaged else ''
@@ -141,12 +356,13 @@ class Railroad(Space):
     '''
     Subclass of Space. Represents the four railroads on the board
     '''
+    __slots__ = ('name', 'price')
+    
     def __init__(self, name=None, price=200, owner=None, mortgaged=False):
+        super().__init__(kind='railroad', owner=owner)
         self.name = name
         self.price = price
-        self.owner = owner
         self.mortgaged = mortgaged
-        super().__init__(kind='railroad')
     def __str__(self):
         owner = 'None' if self.owner is None else self.owner.name
         mort = '(mortgaged)' if self.mortgaged else ''
@@ -157,15 +373,145 @@ class Railroad(Space):
         self.owner = None
         self.mortgaged = False
         
+class BoardSpec():
+    '''
+    Immutable description of a board: the kind, name, color, price, rent table
+    and house price of every space, and the color groups. A spec holds no game 
+    state, so one spec is shared by every Board built from it in a process 
+    (see board_spec()).
+    '''
+    def __init__(self, spaces):
+        set_ = object.__setattr__
+        set_(self, 'kinds', tuple(s['kind'] for s in spaces))
+        set_(self, 'names', tuple(s['name'] for s in spaces))
+        set_(self, 'colors', tuple(s['color'] for s in spaces))
+        set_(self, 'prices', tuple(s['price'] for s in spaces))
+        set_(self, 'rents', tuple(s['rent'] for s in spaces))
+        set_(self, 'house_prices', tuple(s['house_price'] for s in spaces))
+        groups = defaultdict(list)
+        for index, space in enumerate(spaces):
+            if space['kind'] == 'property':
+                groups[space['color']].append(index)
+        set_(self, 'color_groups', {c: tuple(g) for c, g in groups.items()})
+        # Maps each index to the spaces whose rent depends on who owns it (see
+        # Board._rent_group)
+        keys = [s['color'] if s['kind'] == 'property' else s['kind']
+                for s in spaces]
+        rent_groups = defaultdict(list)
+        for index, key in enumerate(keys):
+            rent_groups[key].append(index)
+        set_(self, 'rent_groups', 
+             tuple(tuple(rent_groups[key]) for key in keys))
+        
+    def __setattr__(self, name, value):
+        raise AttributeError('BoardSpec is immutable')
+        
+    def __len__(self):
+        return len(self.kinds)
+    
+    def __repr__(self):
+        return f'BoardSpec({len(self)} spaces)'
+    
+    def make_space(self, index):
+        '''
+        Returns a new, unowned Space object for the given board position. Its
+        static data refers to the spec's (shared) values.
+        '''
+        kind = self.kinds[index]
+        if kind == 'property':
+            return Property(name = self.names[index],
+                            color = self.colors[index],
+                            price = self.prices[index],
+                            rent_data = self.rents[index],
+                            house_price = self.house_prices[index])
+        elif kind == 'railroad':
+            return Railroad(name=self.names[index])
+        elif kind == 'utility':
+            return Utility(name=self.names[index])
+        else:
+            return Space(kind=kind)
+        
 class Board(dict):
     '''
     Subclass of dict. Maps an index 0,1,...,39 to Space objects. Keeps track
     of color groups and available houses.
+    
+    The per-game state of all spaces is kept in three flat lists indexed by
+    board position: owners, house_counts and mortgaged. Board.reset() clears 
+    them in one go. Board.version is incremented on every change of 
+    ownership or houses, Board.owner_changes on every change of ownership.
+    
+    The board also holds the two decks of cards, Board.chance and
+    Board.community_chest.
+
+    A fourth list, rents, holds the rent currently charged on each space, as
+    in Player.pay_rent: 0 if unowned or mortgaged, and for a utility the 
+    multiplier of the dice roll (4 or 10). It is updated whenever the 
+    state of a space changes, only for the spaces whose rent can change 
+    (see Board.update_rent and Board.update_group_rents).
     '''
-    def __init__(self, houses=44, **kwargs):
+    def __init__(self, spec=None, houses=44):
+        super().__init__()
+        self.spec = spec
         self.houses = houses
-        super().__init__(kwargs)
+        self.version = 0
+        self.owner_changes = 0
+        self.owners = []
+        self.house_counts = []
+        self.mortgaged = []
+        self.rents = []
+        self.chance = ChanceDeck()
+        self.community_chest = CommunityChest()
+        self._color_groups = None
+        self._rent_groups = None
+        self._nearest = {}
+        if spec is not None:
+            # New spaces from a spec are unowned, so they are placed directly
+            # rather than through __setitem__, and the rent groups come from
+            # the spec instead of being rebuilt after every insertion
+            n = len(spec)
+            self.owners = [None] * n
+            self.house_counts = [0] * n
+            self.mortgaged = [False] * n
+            self.rents = [0] * n
+            for index in range(n):
+                space = spec.make_space(index)
+                space._board = self
+                space.index = index
+                super().__setitem__(index, space)
+            self._rent_groups = spec.rent_groups
         
+    def __setitem__(self, index, space):
+        # Move the space's state into this board's arrays
+        missing = index + 1 - len(self.owners)
+        if missing > 0:
+            self.owners.extend([None] * missing)
+            self.house_counts.extend([0] * missing)
+            self.mortgaged.extend([False] * missing)
+            self.rents.extend([0] * missing)
+        state, i = space._board, space.index
+        owner = state.owners[i]
+        space.owner = None
+        self.house_counts[index] = state.house_counts[i]
+        self.mortgaged[index] = state.mortgaged[i]
+        space._board = self
+        space.index = index
+        self._color_groups = None
+        self._rent_groups = None
+        self._nearest = {}
+        super().__setitem__(index, space)
+        space.owner = owner
+
+    def __reduce__(self):
+        # The default dict pickling would restore the spaces through
+        # __setitem__ before the state arrays exist
+        return (self.__class__, (), (self.__dict__, dict(self)))
+
+    def __setstate__(self, state):
+        attributes, spaces = state
+        self.__dict__.update(attributes)
+        dict.update(self, spaces)
+
     def __str__(self):
         out = ''
         for index, space in self.items():
@@ -174,54 +520,711 @@ class Board(dict):
     
     def reset(self):
         self.houses = 44
-        for index, space in self.items():
-            space.reset()
+        for player in set(self.owners):
+            if player is not None:
+                player._clear_owned()
+        n = len(self.owners)
+        self.owners[:] = [None] * n
+        self.house_counts[:] = [0] * n
+        self.mortgaged[:] = [False] * n
+        self.rents[:] = [0] * n
+        self.chance.reset()
+        self.community_chest.reset()
+        self.version += 1
+        self.owner_changes += 1
             
     @property
     def color_groups(self):
-        groups = defaultdict(list)
-        for p in list(self.values()):
-            groups[p.color].append(p)
-        return groups
+        '''
+        Maps each color to the list of spaces of that color, in board order.
+        Computed once and cached until a space is replaced.
+        '''
+        if self._color_groups is None:
+            groups = defaultdict(list)
+            for p in list(self.values()):
+                groups[p.color].append(p)
+            self._color_groups = groups
+        return self._color_groups
+    
+    def nearest(self, kind):
+        '''
+        Returns a tuple that maps every board position to the first space of
+        the given kind ahead of it, e.g. for 'advance to the nearest railroad'.
+        Computed once and cached until a space is replaced.
+        '''
+        table = self._nearest.get(kind)
+        if table is None:
+            kinds = [self[i].kind for i in range(len(self))]
+            table = self._nearest[kind] = _nearest_table(kinds, kind)
+        return table
+
+    def _rent_group(self, index):
+        '''
+        Returns the indexes of the spaces whose rent depends on who owns the
+        space at 'index': its color group, all railroads or all utilities.
+        '''
+        if self._rent_groups is None:
+            keys = {i: space.color if space.kind == 'property' else space.kind
+                    for i, space in self.items()}
+            groups = defaultdict(list)
+            for i, key in keys.items():
+                groups[key].append(i)
+            self._rent_groups = {i: tuple(groups[key]) for i, key in keys.items()}
+        return self._rent_groups[index]
+    
+    def update_group_rents(self, index):
+        '''
+        Recomputes the rents of all the spaces whose rent depends on who owns
+        the space at 'index', after a change of its owner.
+        '''
+        for i in self._rent_group(index):
+            self.update_rent(i)
+            
+    def update_rent(self, index):
+        '''
+        Recomputes the rent of the space at 'index', after a change of its 
+        houses or mortgage.
+        '''
+        owner = self.owners[index]
+        if owner is None or self.mortgaged[index]:
+            self.rents[index] = 0
+            return
+        space = self[index]
+        kind = space.kind
+        # Reads the owner's ownership index directly: this runs on every 
+        # change of state
+        if kind == 'property':
+            houses = self.house_counts[index]
+            rent = space.rent_data[houses]
+            if houses == 0 and space.color in owner._monopolies:
+                rent = rent * 2
+        elif kind == 'railroad':
+            rent = 50 * owner._railroads
+        elif kind == 'utility':
+            rent = 4 if owner._utilities == 1 else 10
+        else:
+            rent = 0
+        self.rents[index] = rent
         
-def build_board():
+    def update_all_rents(self):
+        '''
+        Recomputes every rent, after the state lists were written directly.
+        '''
+        for index in self:
+            self.update_rent(index)
+        
+BOARD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'property_data.xlsx')
+COMPILED_BOARD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'monopoly_board.py')
+
+# Board specs already built in this process, keyed by the content hash of
+# their source. The lock makes every thread get the same spec.
+_board_specs = {}
+_board_specs_lock = threading.Lock()
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def read_board_data(path=BOARD_FILE):
     '''
-    Builds a game board using data in an Excel sheet.
+    Reads the board definition from an Excel sheet. This is the only place 
+    that needs pandas (and openpyxl), which are imported here rather than at
+    module level.
 
     Returns
     -------
-    board : Board
+    spaces : tuple of dict
+        One dict per space, in board order, with keys 'kind', 'name', 
+        'color', 'price', 'rent' and 'house_price'. Missing values are None.
 
     '''
-    board = Board()
-    board_data = pd.read_excel('property_data.xlsx')
+    import pandas as pd
+    
+    def value(row, column, kind=None):
+        v = row[column]
+        if pd.isna(v):
+            return None
+        return kind(v) if kind else v
+    
+    spaces = []
+    board_data = pd.read_excel(path)
     for index, row in board_data.iterrows():
+        rent = None
         if row['kind'] == 'property':
-            board[index] = Property(
-                        name = row['name'],
-                        color = row['color'],
-                        price = row['price'],
-                        rent_data = {0:row['rent0'],
-                                     1:row['rent1'],
-                                     2:row['rent2'],
-                                     3:row['rent3'],
-                                     4:row['rent4'],
-                                     5:row['rent5']},
-                        house_price = row['house_price'])
-        elif row['kind'] == 'railroad':
-            board[index] = Railroad(name=row['name'])
-        elif row['kind'] == 'utility':
-            board[index] = Utility(name=row['name'])
-        else:
-            board[index] = Space(kind=row['kind'])
-    return board
+            rent = tuple(int(row[f'rent{h}']) for h in range(6))
+        spaces.append({'kind': row['kind'],
+                       'name': value(row, 'name'),
+                       'color': value(row, 'color'),
+                       'price': value(row, 'price', int),
+                       'rent': rent,
+                       'house_price': value(row, 'house_price', int)})
+    return tuple(spaces)
+
+def compile_board(path=BOARD_FILE, out=COMPILED_BOARD_FILE):
+    '''
+    Reads the board definition from an Excel sheet and writes it out as the 
+    Python module monopoly_board.py, together with the hash of the sheet. 
+    Run this after editing the spreadsheet.
+    '''
+    spaces = read_board_data(path)
+    with open(out, 'w') as f:
+        f.write('# -*- coding: utf-8 -*-\n\n')
+        f.write('"""\n'
+                f'Board definition compiled from {os.path.basename(path)} by\n'
+                'monopoly.compile_board(). Do not edit by hand; edit the\n'
+                'spreadsheet and recompile instead.\n'
+                '"""\n\n')
+        f.write(f'SOURCE_SHA256 = {_file_hash(path)!r}\n\n')
+        f.write('SPACES = (\n')
+        for space in spaces:
+            f.write(f'    {space!r},\n')
+        f.write(')\n')
+    
+def _compiled_board_data():
+    import monopoly_board
+    return monopoly_board.SOURCE_SHA256, monopoly_board.SPACES
+
+def board_spec(path=None):
+    '''
+    Returns the shared BoardSpec for the compiled board definition in 
+    monopoly_board.py, or for the Excel sheet at 'path'. A sheet is only read
+    (with pandas) if its contents differ from the compiled definition, and 
+    each distinct definition is only turned into a spec once per process.
+    '''
+    source_hash, spaces = _compiled_board_data()
+    key = source_hash if path is None else _file_hash(path)
+    spec = _board_specs.get(key)
+    if spec is None:
+        with _board_specs_lock:
+            spec = _board_specs.get(key)
+            if spec is None:
+                if key != source_hash:
+                    spaces = read_board_data(path)
+                spec = _board_specs[key] = BoardSpec(spaces)
+    return spec
+
+def build_board(path=None):
+    '''
+    Builds a game board from the shared BoardSpec (see board_spec()). By 
+    default this is the compiled definition in monopoly_board.py, which does
+    not need pandas.
+
+    Returns
+    -------
+    board : Board
+
+    '''
+    return Board(board_spec(path))
+
+# Maps a random byte to a die face. Bytes 252-255 are dropped so that each 
+# face is exactly equally likely (252 = 6*42).
+_DIE_FACES = bytes((b % 6) + 1 if b < 252 else 0 for b in range(256))
+_DIE_REJECT = bytes(range(252, 256))
+
+class Dice():
+    '''
+    Seedable source of randomness for one game. Die rolls are generated in
+    blocks from random bytes and read through with a cursor, which is much 
+    cheaper than one random.randint() call per die. The underlying 
+    random.Random is available as Dice.rng for other random choices.
+    '''
+    __slots__ = ('rng', '_block', '_cursor')
+    
+    BLOCK_SIZE = 1024
+    
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self._block = b''
+        self._cursor = 0
+        
+    def __repr__(self):
+        return f'Dice(cursor={self._cursor}, block={len(self._block)})'
+        
+    def seed(self, seed):
+        '''
+        Re-seeds the generator and discards any pre-generated rolls.
+        '''
+        self.rng.seed(seed)
+        self._block = b''
+        self._cursor = 0
+        
+    def getstate(self):
+        '''
+        Returns the state of the dice, for setstate(). Pre-generated rolls are
+        included, so the dice continue exactly where they were.
+        '''
+        return (self.rng.getstate(), self._block, self._cursor)
+    
+    def setstate(self, state):
+        rng_state, self._block, self._cursor = state
+        self.rng.setstate(rng_state)
+        
+    def roll(self):
+        '''
+        Returns the faces of two dice as a tuple.
+        '''
+        i = self._cursor
+        if i + 2 > len(self._block):
+            self._block = self.rng.randbytes(self.BLOCK_SIZE).translate(
+                _DIE_FACES, _DIE_REJECT)
+            i = 0
+        self._cursor = i + 2
+        return self._block[i], self._block[i+1]
+
+class Event():
+    '''
+    Base class of the records emitted on an EventBus. Each event type lists 
+    its fields in __slots__ and has a message template; the message is only 
+    formatted when str() is called on the event.
+    '''
+    __slots__ = ()
+    message = ''
+    
+    def __init__(self, *args):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+            
+    def __str__(self):
+        return self.message.format(**{f: getattr(self, f) for f in self.__slots__})
+    
+    def __repr__(self):
+        fields = ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+    
+def _event_type(name, fields, message):
+    return type(name, (Event,), {'__slots__': fields, 'message': message})
+
+TurnStart   = _event_type('TurnStart', ('player', 'cash'),
+                          "{player.name}'s turn. (Cash={cash})")
+InJail      = _event_type('InJail', ('player', 'turns'),
+                          '{player.name} has been in jail for {turns} turns.')
+JailEscape  = _event_type('JailEscape', ('player',),
+                          '{player.name} escapes from jail.')
+PostBail    = _event_type('PostBail', ('player',),
+                          '{player.name} posts bail.')
+GoToJail    = _event_type('GoToJail', ('player',),
+                          '{player.name} goes to jail.')
+PassGo      = _event_type('PassGo', ('player',),
+                          '{player.name} passes go and collects $200.')
+Land        = _event_type('Land', ('player', 'index', 'space'),
+                          '{player.name} lands on space {index} ({space.kind}).')
+OwnSpace    = _event_type('OwnSpace', ('player', 'prop'),
+                          '{player.name} owns {prop.name}.')
+Buy         = _event_type('Buy', ('player', 'prop'),
+                          '{player.name} buys {prop.name}.')
+DeclineBuy  = _event_type('DeclineBuy', ('player', 'prop'),
+                          '{player.name} chooses not to buy {prop.name}.')
+PayRent     = _event_type('PayRent', ('player', 'owner', 'amount'),
+                          '{player.name} pays ${amount} to {owner.name}.')
+PayPlayer   = _event_type('PayPlayer', ('player', 'other', 'amount'),
+                          '{player.name} pays ${amount} to {other.name}.')
+DrawCard    = _event_type('DrawCard', ('player', 'card'),
+                          '{player.name} draws a card: {card}.')
+UseJailCard = _event_type('UseJailCard', ('player',),
+                          '{player.name} uses a get out of jail free card.')
+PayBank     = _event_type('PayBank', ('player', 'amount'),
+                          '{player.name} pays ${amount} to the bank.')
+Mortgage    = _event_type('Mortgage', ('player', 'prop'),
+                          '{player.name} mortgages {prop.name}')
+Unmortgage  = _event_type('Unmortgage', ('player', 'prop'),
+                          '{player.name} un-mortgages {prop.name}.')
+BuyHouse    = _event_type('BuyHouse', ('player', 'prop'),
+                          '{player.name} buys a house for {prop.name}.')
+NoHouses    = _event_type('NoHouses', ('player', 'prop'),
+                          '{player.name} tried to buy a house, but there are none left.')
+SellHouse   = _event_type('SellHouse', ('player', 'prop'),
+                          '{player.name} sells a house from {prop.name}.')
+Bankruptcy  = _event_type('Bankruptcy', ('player', 'creditor'),
+                          '{player.name} declares bankruptcy!')
+Trade       = _event_type('Trade', ('buyer', 'seller', 'buy', 'sell'),
+                          '{buyer.name} trades {sell.name} to {seller.name} for {buy.name}.')
+
+class Roll(Event):
+    __slots__ = ('player', 'dice1', 'dice2')
+    
+    def __str__(self):
+        d = ', a double!' if self.dice1 == self.dice2 else ''
+        return (f'{self.player.name} rolls {self.dice1 + self.dice2} '
+                f'({self.dice1}+{self.dice2}){d}')
+
+class GameOver(Event):
+    __slots__ = ('winner', 'rounds', 'outcome')
+    
+    def __str__(self):
+        if self.winner is None:
+            return f'The game ends in a draw ({self.outcome}).'
+        if self.outcome == 'bankruptcy':
+            return f'Winner is {self.winner.name}!'
+        return f'Winner is {self.winner.name} on net worth ({self.outcome}).'
+
+class EventBus():
+    '''
+    Delivers events to subscribers, which are callables taking one Event.
+    
+    Code that emits events first checks 'if bus.subscribers:', so that when 
+    nobody is listening no event object is even created.
+    '''
+    def __init__(self):
+        self.subscribers = []
+        
+    def __repr__(self):
+        return f'EventBus(subscribers={self.subscribers})'
+        
+    def subscribe(self, subscriber):
+        if subscriber not in self.subscribers:
+            self.subscribers.append(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        
+    def emit(self, event):
+        for subscriber in self.subscribers:
+            subscriber(event)
+            
+class ConsoleSink():
+    '''
+    Subscriber that prints every event.
+    '''
+    def __call__(self, event):
+        print(event)
+        
+class RingBufferSink():
+    '''
+    Subscriber that keeps the last 'maxlen' events (all of them if maxlen is 
+    None).
+    '''
+    def __init__(self, maxlen=10000):
+        self.events = deque(maxlen=maxlen)
+        
+    def __call__(self, event):
+        self.events.append(event)
+        
+    def clear(self):
+        self.events.clear()
+        
+class FileSink():
+    '''
+    Subscriber that writes one line per event to a file. Accepts a path or an
+    open text file.
+    '''
+    def __init__(self, file):
+        self._owns_file = isinstance(file, (str, os.PathLike))
+        self.file = open(file, 'w') if self._owns_file else file
+        
+    def __call__(self, event):
+        self.file.write(f'{event}\n')
+        
+    def close(self):
+        if self._owns_file:
+            self.file.close()
+
+class GameStats():
+    '''
+    Opt-in profiling counters of a game (see Game(collect_stats=True)): the 
+    number of calls and cumulative time, in seconds, of each phase of play, 
+    and counts of other work done. Phase times are inclusive, e.g. 'pay_rent' 
+    includes the 'cover_debt' it triggers. Stats of many games, possibly from
+    different processes, can be added up with merge().
+    
+    Phases: play, take_turn, move, resolve_space, pay_rent, cover_debt, 
+            build, find_trades, random_trade
+    Counts: rounds, turns, trades, random_trades, cards (cards drawn),
+            owned_rebuilds (rebuilds of a Player.owned list) and
+            wants_scans (Player.wants lookups)
+    '''
+    PHASES = ('play', 'take_turn', 'move', 'resolve_space', 'pay_rent', 
+              'cover_debt', 'build', 'find_trades', 'random_trade')
+    
+    def __init__(self):
+        self.calls = Counter()
+        self.times = Counter()
+        self.counts = Counter()
+        
+    def __repr__(self):
+        return (f'GameStats(calls={dict(self.calls)}, '+
+                f'counts={dict(self.counts)})')
+        
+    def __str__(self):
+        total = self.times['play']
+        out = f'{"phase":<15}{"calls":>10}{"seconds":>10}{"us/call":>10}{"% play":>8}\n'
+        for phase in self.PHASES:
+            calls = self.calls[phase]
+            if not calls:
+                continue
+            seconds = self.times[phase]
+            share = f'{100*seconds/total:7.1f}%' if total else ''
+            out += (f'{phase:<15}{calls:>10}{seconds:>10.3f}'
+                    f'{1e6*seconds/calls:>10.1f}{share}\n')
+        for name, count in sorted(self.counts.items()):
+            out += f'{name:<15}{count:>10}\n'
+        return out.rstrip('\n')
+        
+    def call(self, phase, func, *args):
+        '''
+        Calls func(*args), adding the call and its duration to 'phase'.
+        '''
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.times[phase] += time.perf_counter() - start
+            self.calls[phase] += 1
+            
+    def merge(self, other):
+        '''
+        Adds the counters of another GameStats to these. Returns self.
+        '''
+        self.calls.update(other.calls)
+        self.times.update(other.times)
+        self.counts.update(other.counts)
+        return self
+
+class Strategy():
+    '''
+    The decisions a player makes: whether to buy, when to un-mortgage and 
+    build, how to raise cash and which trades to propose and accept. Player
+    calls these hooks, and carries out their decisions with its own actions 
+    (Player.buy_house, Player.mortgage, ...). The methods of this class are
+    the default rules; subclass it and override some hooks for a different
+    strategy.
+    
+    The default rules keep cash above a threshold: the strategy's own
+    cash_threshold, or the player's (Player.cash_threshold) if it is None.
+    '''
+    def __init__(self, name=None, cash_threshold=None):
+        self.cash_threshold = cash_threshold
+        if name is None:
+            name = type(self).__name__
+            if cash_threshold is not None:
+                name += f'({cash_threshold})'
+        self.name = name
+        
+    def __repr__(self):
+        return f'{type(self).__name__}(name={self.name})'
+        
+    def threshold(self, player):
+        if self.cash_threshold is None:
+            return player.cash_threshold
+        return self.cash_threshold
+    
+    def buy(self, player, prop):
+        '''
+        Returns True if 'player' should buy the unowned 'prop' it landed on.
+        '''
+        return player.cash - prop.price > self.threshold(player)
+    
+    def use_jail_card(self, player):
+        '''
+        Returns True if 'player', in jail and holding a get out of jail free
+        card, uses it at the start of its turn.
+        '''
+        return True
+
+    def un_mortgage(self, player):
+        '''
+        Called at the end of each turn. Un-mortgages properties, in board 
+        order, as long as cash stays above the threshold.
+        '''
+        threshold = self.threshold(player)
+        if player.cash > threshold and player.mortgages:
+            for prop in player.owned:
+                if prop.mortgaged and (player.cash-1.1*0.5*prop.price)>=threshold:
+                    player.un_mortgage(prop)
+                    
+    def build(self, player):
+        '''
+        Called at the end of each turn, after un_mortgage(). Buys the houses
+        planned by plan_build().
+        '''
+        plan = self.plan_build(player)
+        if plan:
+            player.buy_houses(plan)
+            
+    def plan_build(self, player):
+        '''
+        Plans the houses to buy on each monopoly, building evenly, as long as
+        cash stays above the threshold. Each monopoly is built in rounds: the
+        unmortgaged properties below the highest level get a house, or all of
+        them if they are level, up to 5. A mortgaged property below that 
+        level stops the building of its color.
+        
+        The plan is worked out on counters, without buying anything, and 
+        takes at most one round per house bought. If the bank runs out of 
+        houses, the plan ends with the first house it can't supply.
+
+        Returns
+        -------
+        plan : list of Property
+            One entry per house, in the order they are bought.
+
+        '''
+        threshold = self.threshold(player)
+        cash = player.cash
+        if cash <= threshold:
+            return []
+        board = player.board
+        supply = board.houses
+        house_counts = board.house_counts
+        plan = []
+        for color in player.monopolies:
+            props = board.color_groups[color]
+            price = props[0].house_price
+            budget = int((cash - threshold) // price)
+            if budget <= 0 or supply == 0:
+                continue
+            counts = [house_counts[p.index] for p in props]
+            bought = 0
+            while bought < budget:
+                top = max(counts)
+                limit = top + 1 if min(counts) == top else top
+                if limit > 5:
+                    break
+                progress = False
+                for i, prop in enumerate(props):
+                    if counts[i] < limit and not prop.mortgaged and bought < budget:
+                        plan.append(prop)
+                        if bought == supply:
+                            return plan
+                        counts[i] += 1
+                        bought += 1
+                        progress = True
+                if not progress:
+                    break
+            cash -= bought * price
+            supply -= bought
+        return plan
+                
+    def liquidate(self, player, debt):
+        '''
+        Raises cash for a debt 'player' can't pay, as planned by 
+        plan_liquidation(). Returns True once more than 'debt' was raised, or
+        False if everything was exhausted (the player then goes bankrupt).
+        '''
+        plan, covered = self.plan_liquidation(player, debt)
+        for action, prop in plan:
+            if action == 'mortgage':
+                player.mortgage(prop)
+            else:
+                player.sell_house(prop)
+        return covered
+    
+    def plan_liquidation(self, player, debt):
+        '''
+        Plans how 'player' raises cash for a debt it can't pay. Starts by 
+        mortgaging railroads and utilities, then sells one house from each
+        property, and finally mortgages colored properties, each in board 
+        order, and stops as soon as more than 'debt' is raised.
+        
+        One pass over the player's properties sorts what can be raised into
+        these three groups and sums it up, so a debt that everything together
+        can't cover is recognized before any action is chosen.
+
+        Returns
+        -------
+        plan : list of (str, Space)
+            The actions, 'mortgage' or 'sell_house', in order. If the debt 
+            can't be covered, every possible action.
+        covered : bool
+            True if the plan raises more than 'debt'.
+
+        '''
+        mortgages, sales, properties = [], [], []
+        total = 0
+        house_counts = player.board.house_counts
+        for prop in player.owned:
+            if isinstance(prop, Property):
+                if house_counts[prop.index] > 0:
+                    sales.append(prop)
+                    total += 0.5*prop.house_price
+                if not prop.mortgaged:
+                    properties.append(prop)
+                    total += 0.5*prop.price
+            elif not prop.mortgaged:
+                mortgages.append(prop)
+                total += 0.5*prop.price
+        
+        plan = [('mortgage', p) for p in mortgages]
+        plan += [('sell_house', p) for p in sales]
+        plan += [('mortgage', p) for p in properties]
+        if total <= debt:
+            return plan, False
+        
+        raised = 0
+        for n, (action, prop) in enumerate(plan, 1):
+            if action == 'mortgage':
+                raised += 0.5*prop.price
+            else:
+                raised += 0.5*prop.house_price
+            if raised > debt:
+                return plan[:n], True
+        return plan, False
+    
+    def propose_trade(self, game, buyer):
+        '''
+        Called after each of buyer's turns. Returns a trade (seller, buy, 
+        sell) for buyer to propose, where 'buy' is a property of 'seller' and
+        'sell' one of buyer's, or None. A trade is proposed if and only if:
+            1. 'Buyer' has at least one "almost monopoly" (see Player.wants).
+            2. Another player ('seller') owns one of the properties that
+               'buyer' wants
+            3. 'Buyer' also has a property that 'seller' wants
+            
+        Then 'buyer' wants property 'buy', which 'seller' owns, and 'seller'
+        wants property 'sell', which 'buyer' owns, and the two are of 
+        different colors.
+        
+        This rule is not ideal. It is possible and somewhat likely that the 
+        trade conditions will never occur, and thus a game will continue 
+        forever. For now, this is worked around by Game.random_trade.
+        
+        Game.find_trades doesn't call this again until a property has 
+        changed hands, so the answer must only depend on who owns what.
+        '''
+        wants = buyer.wants
+        if wants:
+            for seller in game.players:
+                if seller is buyer:
+                    continue
+                buyer_wants  = [p for p in wants if p.owner is seller]
+                if not buyer_wants:
+                    continue
+                seller_wants = [p for p in seller.wants if p.owner is buyer]
+                for b in buyer_wants:
+                    for s in seller_wants:
+                        if b.color != s.color:
+                            return (seller, b, s)
+        return None
+    
+    def accept_trade(self, player, other, give, get):
+        '''
+        Returns True if 'player' accepts to give property 'give' to 'other' 
+        in exchange for 'get'. The default proposals are good for both 
+        sides, so they are always accepted.
+        '''
+        return True
+
+DEFAULT_STRATEGY = Strategy()
 
 class Player():
     '''
     Each instance represents one of the players in a game. Handles all actions
     and behaviors a typical player would have. Tracks properties owned, jail
     status, cash amount, bankruptcy status, and monopolies.
+    
+    Decisions are made by Player.strategy (see Strategy); DEFAULT_STRATEGY 
+    unless another one is given.
     '''
+    __slots__ = ('name', 'cash', 'bankrupt', 'cash_threshold', 'strategy', 
+                 'in_jail', 'turns_in_jail', 'board', 'space', 'debug', 'dice', 'events',
+                 'stats', 'players', '_owned', '_owned_list', '_railroads',
+                 '_utilities', '_color_counts', '_monopolies',
+                 '_almost_monopolies', '_wants', '_mortgages', '_houses',
+                 '_hotels')
+    
     def __init__(self,
                  name=None,
                  cash=1500,
@@ -231,7 +1234,11 @@ class Player():
                  turns_in_jail=0,
                  board = None,
                  space = 0,
-                 debug = False):
+                 debug = False,
+                 dice = None,
+                 events = None,
+                 stats = None,
+                 strategy = None):
         self.name = name
         self.cash = cash
         self.bankrupt = bankrupt
@@ -241,6 +1248,15 @@ class Player():
         self.board = board
         self.space = space
         self.debug = debug
+        self.dice = dice if dice is not None else Dice()
+        self.events = events if events is not None else EventBus()
+        self.stats = stats
+        self.strategy = strategy if strategy is not None else DEFAULT_STRATEGY
+        # All the players of the game, self included (set by Game.reset)
+        self.players = [self]
+        if debug:
+            self.events.subscribe(ConsoleSink())
+        self._clear_owned()
         
     def __str__(self):
         b = '(bankrupt)' if self.bankrupt else ''
@@ -268,89 +1284,199 @@ class Player():
         self.in_jail = False
         self.turns_in_jail = 0
         self.space = 0
+        self._clear_owned()
 
-    def has_monopoly(self, color):
+    def copy(self):
         '''
-        Given a color, returns True if player has a monopoly in that color, and
-        False otherwise.
+        Returns a new player with the same name, cash_threshold and strategy,
+        not bound to any game. A Player belongs to the game it was last reset
+        in, so games running in different threads need their own copies.
         '''
-        count = 0
-        for prop in self.owned:
-            if not isinstance(prop, Property):
-                continue
-            if prop.color == color:
-                count += 1
-        if color in ['blue', 'brown']:
-            need = 2
+        return Player(name=self.name, cash_threshold=self.cash_threshold,
+                      strategy=self.strategy)
+
+    def _clear_owned(self):
+        '''
+        Forgets every property self owns. Called when the board is reset.
+        '''
+        self._owned = {}
+        self._owned_list = None
+        self._wants = None
+        self._railroads = 0
+        self._utilities = 0
+        self._mortgages = 0
+        self._houses = 0
+        self._hotels = 0
+        self._color_counts = defaultdict(int)
+        self._monopolies = set()
+        self._almost_monopolies = set()
+
+    def _add_owned(self, prop):
+        '''
+        Records that self now owns prop. Called by Space.owner.
+        '''
+        self._owned[prop.index] = prop
+        self._owned_list = None
+        if prop.mortgaged:
+            self._mortgages += 1
+        if isinstance(prop, Property):
+            self._count_buildings(prop.houses, 1)
+            self._color_counts[prop.color] += 1
+            self._update_color(prop.color)
+            self._wants = None
+        elif isinstance(prop, Railroad):
+            self._railroads += 1
+        elif isinstance(prop, Utility):
+            self._utilities += 1
+            
+    def _remove_owned(self, prop):
+        '''
+        Records that self no longer owns prop. Called by Space.owner.
+        '''
+        # A stale board from an earlier game may still point at self, so only
+        # forget prop if it is the space we are actually tracking.
+        if self._owned.get(prop.index) is not prop:
+            return
+        del self._owned[prop.index]
+        self._owned_list = None
+        if prop.mortgaged:
+            self._mortgages -= 1
+        if isinstance(prop, Property):
+            self._count_buildings(prop.houses, -1)
+            self._color_counts[prop.color] -= 1
+            self._update_color(prop.color)
+            self._wants = None
+        elif isinstance(prop, Railroad):
+            self._railroads -= 1
+        elif isinstance(prop, Utility):
+            self._utilities -= 1
+            
+    def _count_buildings(self, houses, sign):
+        '''
+        Adds (sign=1) or removes (sign=-1) the buildings of a property with
+        'houses' houses to the player's counts; 5 houses are a hotel.
+        '''
+        if houses == 5:
+            self._hotels += sign
         else:
-            need = 3
-        if count < need:
-            return False
+            self._houses += sign * houses
+
+    def _update_color(self, color):
+        '''
+        Refreshes the monopoly and almost-monopoly sets for one color after
+        its count changed.
+        '''
+        count = self._color_counts[color]
+        need = Property.GROUP_SIZES.get(color, 3)
+        if count >= need:
+            self._monopolies.add(color)
         else:
-            return True
-        
-    def printd(self, msg):
+            self._monopolies.discard(color)
+        if count == need - 1:
+            self._almost_monopolies.add(color)
+        else:
+            self._almost_monopolies.discard(color)
+
+    def has_monopoly(self, color):
         '''
-        Given a string, prints only if self.debug = True.
+        Given a color, returns True if player has a monopoly in that color, and
+        False otherwise.
         '''
-        if self.debug:
-            print(msg)
+        return color in self._monopolies
         
     @property
     def owned(self):
         '''
-        Returns a list of properties that this player owns.
+        Returns a list of properties that this player owns, in board order.
         '''
-        owned = []
-        for index, space in self.board.items():
-            if isinstance(space, (Property, Utility, Railroad)):
-                if space.owner == self:
-                    owned.append(space)
-        return owned
+        if self._owned_list is None:
+            if self.stats is not None:
+                self.stats.counts['owned_rebuilds'] += 1
+            self._owned_list = [self._owned[i] for i in sorted(self._owned)]
+        return self._owned_list
                     
     @property
     def monopolies(self):
         '''
         Returns a list of monopolies that this player has.
         '''
-        m = []
-        for color in Property.COLORS:
-            if self.has_monopoly(color):
-                m.append(color)
-        return m
+        if not self._monopolies:
+            return []
+        return [c for c in Property.COLORS if c in self._monopolies]
+
+    @property
+    def mortgages(self):
+        '''
+        Returns the number of mortgaged properties this player owns.
+        '''
+        return self._mortgages
 
     @property
     def railroads_owned(self):
         '''
-        Returns a list of Railroads that the player owns.
+        Returns the number of Railroads that the player owns.
         '''
-        count = 0
-        for prop in self.owned:
-            if isinstance(prop, Railroad):
-                count +=1
-        return count
+        return self._railroads
     
     @property
     def houses_owned(self):
         '''
-        Returns a count of the total number of houses this player owns.
+        Returns a count of the total number of houses this player owns, a
+        hotel counting as 5.
         '''
-        count = 0
+        return self._houses + 5 * self._hotels
+
+    @property
+    def hotels_owned(self):
+        '''
+        Returns the number of hotels this player owns.
+        '''
+        return self._hotels
+
+    @property
+    def jail_card(self):
+        '''
+        Returns the deck whose get out of jail free card this player holds,
+        or None.
+        '''
+        board = self.board
+        for deck in (board.chance, board.community_chest):
+            if deck.holder is self:
+                return deck
+        return None
+    
+    @property
+    def net_worth(self):
+        '''
+        Returns cash plus the value of everything the player owns: the price
+        of each property (half of it if mortgaged) and of its houses.
+        '''
+        worth = self.cash
         for prop in self.owned:
+            worth += prop.price // 2 if prop.mortgaged else prop.price
             if isinstance(prop, Property):
-                count += prop.houses
-        return count
+                worth += prop.houses * prop.house_price
+        return worth
+    
+    def potential_rent(self, roll=7):
+        '''
+        Returns the rent this player would collect if an opponent landed once
+        on each of its properties, as currently developed (read from 
+        Board.rents), with a dice roll of 'roll' for utilities.
+        '''
+        rents = self.board.rents
+        total = 0
+        for prop in self.owned:
+            rent = rents[prop.index]
+            total += rent * roll if prop.kind == 'utility' else rent
+        return total
     
     @property
     def utilities_owned(self):
         '''
-        Returns a list of Utilities that the player owns.
+        Returns the number of Utilities that the player owns.
         '''
-        count = 0
-        for prop in self.owned:
-            if isinstance(prop, Utility):
-                count +=1
-        return count   
+        return self._utilities   
 
     @property
     def almost_monopolies(self):
@@ -361,16 +1487,9 @@ class Player():
         properties. This information is used to find trade opportunities between
         players.
         '''
-        colors = []
-        for color in Property.COLORS:
-            count = 0
-            for prop in self.owned:
-                if isinstance(prop, Property):
-                    if prop.color == color:
-                        count += 1
-            if (color in ['brown','blue'] and count==1) or count==2:
-                colors.append(color)
-        return colors
+        if not self._almost_monopolies:
+            return []
+        return [c for c in Property.COLORS if c in self._almost_monopolies]
     
     @property
     def wants(self):
@@ -378,20 +1497,29 @@ class Player():
         Returns a list of properties that the player "wants." A player is said
         to "want" a property if that property is the last one needed to 
         complete a monopoly. 
+        
+        The missing property of an almost monopoly only changes when self 
+        gains or loses a property, so the list is kept until then.
         '''
-        wants = []
-        for color in self.almost_monopolies:
-            props = self.board.color_groups[color]
-            for p in props:
-                if p.owner != self:
-                    wants.append(p)
-        return wants
+        if self._wants is None:
+            if self.stats is not None:
+                self.stats.counts['wants_scans'] += 1
+            wants = []
+            for color in self.almost_monopolies:
+                props = self.board.color_groups[color]
+                for p in props:
+                    if p.owner != self:
+                        wants.append(p)
+            self._wants = wants
+        return self._wants
     
     def trade(self, player, buy=None, sell=None):
         '''
         Trades 'sell' (a property owned by self) to 'player' in exchange for
         'buy' (a property owned by the 'player').
         '''
+        if self.stats is not None:
+            self.stats.counts['trades'] += 1
         sell.owner = player
         buy.owner = self
         
@@ -400,11 +1528,12 @@ class Player():
         Changes the 'mortgaged' status of an owned, unmortgaged property to 
         True, and adds the mortgage value of the property to self.cash.
         '''
-        if prop not in self.owned:
+        if prop.owner is not self:
             raise ValueError("Can't mortgage an unowned property!")
         if prop.mortgaged is True:
             raise ValueError("Property is already mortgaged!")
-        self.printd(f'{self.name} mortgages {prop.name}')
+        if self.events.subscribers:
+            self.events.emit(Mortgage(self, prop))
         prop.mortgaged = True
         self.cash += round(0.5*prop.price)
         
@@ -414,11 +1543,12 @@ class Player():
         False, and subtracts the mortgage value of the property plus 10% from
         self.cash.
         '''
-        if prop not in self.owned:
+        if prop.owner is not self:
             raise ValueError("Can't un-mortgage an unowned property!")
         if prop.mortgaged is False:
             raise ValueError("Property is not mortgaged!")
-        self.printd(f'{self.name} un-mortgages {prop.name}.')
+        if self.events.subscribers:
+            self.events.emit(Unmortgage(self, prop))
         prop.mortgaged = False
         self.cash -= round(1.1 * (0.5*prop.price))
     
@@ -429,7 +1559,8 @@ class Player():
         '''
         if prop.owner is not None:
             raise ValueError("Property is already owned!")
-        self.printd(f'{self.name} buys {prop.name}.')
+        if self.events.subscribers:
+            self.events.emit(Buy(self, prop))
         self.cash -= prop.price
         prop.owner = self
         
@@ -441,103 +1572,125 @@ class Player():
         zero, this action fails.
         '''
         if self.board.houses == 0:
-            self.printd(f'{self.name} tried to buy a house, but there are none left.')
+            if self.events.subscribers:
+                self.events.emit(NoHouses(self, prop))
         else:
-            self.printd(f'{self.name} buys a house for {prop.name}.')
+            if self.events.subscribers:
+                self.events.emit(BuyHouse(self, prop))
             self.cash -= prop.house_price
             prop.houses += 1
             self.board.houses -= 1
         
+    def buy_houses(self, props):
+        '''
+        Buys one house on each property of 'props' (a list in which a 
+        property appears once per house, see Strategy.plan_build), in order.
+        Same as buy_house on each of them, but pays and updates the board in
+        one go. Properties beyond the houses left in the bank get nothing.
+        '''
+        board = self.board
+        n = min(len(props), board.houses)
+        if self.events.subscribers:
+            for prop in props[:n]:
+                self.events.emit(BuyHouse(self, prop))
+            for prop in props[n:]:
+                self.events.emit(NoHouses(self, prop))
+        house_counts = board.house_counts
+        cost = 0
+        for prop in props[:n]:
+            houses = house_counts[prop.index] + 1
+            house_counts[prop.index] = houses
+            if houses == 5:
+                self._houses -= 4
+                self._hotels += 1
+            else:
+                self._houses += 1
+            cost += prop.house_price
+        for prop in set(props[:n]):
+            board.update_rent(prop.index)
+        self.cash -= cost
+        board.houses -= n
+        board.version += n
+        
     def sell_house(self, prop):
         '''
         Given a property owned by self, subtracts one house from the property
         and adds one house to the board's available houses. Adds one-half of
         house price of the property to self.cash.
         '''
-        self.printd(f'{self.name} sells a house from {prop.name}.')
+        if self.events.subscribers:
+            self.events.emit(SellHouse(self, prop))
         self.cash += round(0.5*prop.house_price)
         prop.houses -= 1
         self.board.houses += 1
     
-    def pay_rent(self, prop):
+    def pay_rent(self, prop, rent=None):
         '''
-        Pays rent to the owner of a property. If self.cash is lower than the
-        rent amount, calls self.cover_debt() to attempt to raise the cash. 
+        Pays rent to the owner of a property: 'rent', or by default the rent
+        of the property. If self.cash is lower than the rent amount, calls
+        self.cover_debt() to attempt to raise the cash.
         '''
-        if prop.mortgaged:
-            rent = 0
-        else:
-            if isinstance(prop, Property):
-                rent = prop.rent
-                if prop.owner.has_monopoly(prop.color) and prop.houses == 0:
-                    rent = rent * 2
-            elif isinstance(prop, Railroad):
-                rent = 50 * prop.owner.railroads_owned
-            elif isinstance(prop, Utility):
-                if prop.owner.utilities_owned == 1:
-                    mult = 4
-                else:
-                    mult = 10
-                dice_roll = random.randint(1,6) + random.randint(1,6)
-                rent = mult * dice_roll
+        if rent is None:
+            # Board.rents holds the rent, or for a utility the dice multiplier
+            rent = self.board.rents[prop.index]
+            if rent and prop.kind == 'utility':
+                dice1, dice2 = self.dice.roll()
+                rent = rent * (dice1 + dice2)
             
         if self.cash - rent < 0:
-            self.cover_debt(rent - self.cash, prop.owner)
+            if self.stats is None:
+                self.cover_debt(rent - self.cash, prop.owner)
+            else:
+                self.stats.call('cover_debt', self.cover_debt, 
+                                rent - self.cash, prop.owner)
         if not self.bankrupt:
-            self.printd(f'{self.name} pays ${rent} to {prop.owner.name}.')
+            if self.events.subscribers:
+                self.events.emit(PayRent(self, prop.owner, rent))
             self.cash -= rent
             prop.owner.cash += rent
         
+    def pay_player(self, player, amount):
+        '''
+        Pays an amount of money to another player. If self.cash is lower than
+        the amount owed, calls self.cover_debt() to attempt to raise the cash.
+        '''
+        if self.cash - amount < 0:
+            if self.stats is None:
+                self.cover_debt(amount - self.cash, player)
+            else:
+                self.stats.call('cover_debt', self.cover_debt,
+                                amount - self.cash, player)
+        if not self.bankrupt:
+            if self.events.subscribers:
+                self.events.emit(PayPlayer(self, player, amount))
+            self.cash -= amount
+            player.cash += amount
+
     def pay_bank(self, amount):
         '''
         Pays an amount of money to the bank. If self.cash is lower than the 
         amount owed, calls self.cover_debt() to attempt to raise the cash.
         '''
         if self.cash - amount < 0:
-            self.cover_debt(amount, 'bank')
+            if self.stats is None:
+                self.cover_debt(amount, 'bank')
+            else:
+                self.stats.call('cover_debt', self.cover_debt, amount, 'bank')
         if not self.bankrupt:
-            self.printd(f'{self.name} pays ${amount} to the bank.')
+            if self.events.subscribers:
+                self.events.emit(PayBank(self, amount))
             self.cash -= amount
     
     def cover_debt(self, debt, player):
         '''
         Attempts to make up the difference if self.cash can't cover a debt to 
-        the bank or to another player. Starts by mortgaging railroads and 
-        utilities, then sells houses, and finally mortgages colored properties.
-        If all of these alternatives are exhausted, then self declares 
-        bankruptcy. 
+        the bank or to another player, by the strategy's liquidate() (by 
+        default: mortgage railroads and utilities, then sell houses, and 
+        finally mortgage colored properties). If all of these alternatives 
+        are exhausted, then self declares bankruptcy. 
         '''
-        raised = 0
-        
-        # First, mortgage railroads and utilities
-        for prop in self.owned:
-            if isinstance(prop, (Railroad, Utility)):
-                if prop.mortgaged is False:
-                    self.mortgage(prop)
-                    raised += 0.5*prop.price
-                    if raised > debt:
-                        return
-        
-        # Next, sell houses
-        for prop in self.owned:
-            if isinstance(prop, Property):
-                if prop.houses > 0:
-                    self.sell_house(prop)
-                    raised += 0.5*prop.house_price
-                    if raised > debt:
-                        return
-                    
-        # Finally, mortgage properties
-        for prop in self.owned:
-            if isinstance(prop, Property):
-                if prop.mortgaged is False:
-                    self.mortgage(prop)
-                    raised += 0.5*prop.price
-                    if raised > debt:
-                        return
-        
-        # If we got this far and haven't covered debt, declare bankruptcy
-        self.declare_bankruptcy(player)                      
+        if not self.strategy.liquidate(self, debt):
+            self.declare_bankruptcy(player)
         
     def declare_bankruptcy(self, player):
         '''
@@ -546,8 +1699,12 @@ class Player():
         player in the game, then all of self's properties go to that player, as
         well as any remaining amount in self.cash.
         '''
-        self.printd(f'{self.name} declares bankruptcy!')
+        if self.events.subscribers:
+            self.events.emit(Bankruptcy(self, player))
         self.bankrupt = True
+        deck = self.jail_card
+        if deck is not None:
+            deck.holder = None
         for prop in self.owned:
             if player == 'bank':
                 prop.owner = None
@@ -557,24 +1714,74 @@ class Player():
             player.cash += self.cash
             
     def draw_card(self, kind):
-        #TODO: Draw community chest and chance cards
-        pass
-    
+        '''
+        Draws a card from the 'chance' or 'community_chest' deck and carries
+        it out. Cards that move self resolve the space it lands on, except
+        that on the nearest railroad or utility an owner other than self is
+        paid the rent multiplied as the card says.
+        '''
+        board = self.board
+        deck = board.chance if kind == 'chance' else board.community_chest
+        text, action, value = deck.draw(self.dice.rng)
+        if self.events.subscribers:
+            self.events.emit(DrawCard(self, text))
+        if self.stats is not None:
+            self.stats.counts['cards'] += 1
+
+        if action == 'advance':
+            self.move((value - self.space) % 40)
+            self.resolve_space(board[self.space])
+        elif action == 'railroad' or action == 'utility':
+            self.move((board.nearest(action)[self.space] - self.space) % 40)
+            space = board[self.space]
+            rent = board.rents[space.index]
+            if rent == 0 or space.owner is self:
+                self.resolve_space(space)
+            else:
+                if self.events.subscribers:
+                    self.events.emit(Land(self, self.space, space))
+                if action == 'railroad':
+                    rent = value * rent
+                else:
+                    dice1, dice2 = self.dice.roll()
+                    rent = value * (dice1 + dice2)
+                self.pay_rent(space, rent)
+        elif action == 'back':
+            self.move(-value)
+            self.resolve_space(board[self.space])
+        elif action == 'jail':
+            self.go_to_jail()
+        elif action == 'collect':
+            self.cash += value
+        elif action == 'pay':
+            self.pay_bank(value)
+        elif action == 'repairs':
+            cost = value[0] * self._houses + value[1] * self._hotels
+            if cost:
+                self.pay_bank(cost)
+        elif action == 'pay_each':
+            for player in self.players:
+                if self.bankrupt:
+                    break
+                if player is not self and not player.bankrupt:
+                    self.pay_player(player, value)
+        elif action == 'collect_each':
+            for player in self.players:
+                if player is not self and not player.bankrupt:
+                    player.pay_player(self, value)
+        elif action == 'jail_free':
+            deck.holder = self
+
     def roll(self):
         '''
         Rolls the dice! Returns both the total result of the roll, and a boolean
         which is True if the roll was a double, and False otherwise.
         '''
-        dice1 = random.randint(1,6)
-        dice2 = random.randint(1,6)
+        dice1, dice2 = self.dice.roll()
         roll = dice1 + dice2
-        if dice1 == dice2: 
-            double = True
-            d = ', a double!'
-        else:
-            double = False
-            d = ''
-        self.printd(f'{self.name} rolls {roll} ({dice1}+{dice2}){d}')
+        double = dice1 == dice2
+        if self.events.subscribers:
+            self.events.emit(Roll(self, dice1, dice2))
         return (roll, double)
     
     def move(self, spaces):
@@ -585,7 +1792,8 @@ class Player():
         old_space = self.space
         self.space = (old_space + spaces) % 40
         if spaces > 0 and self.space < old_space:
-            self.printd(f'{self.name} passes go and collects $200.')
+            if self.events.subscribers:
+                self.events.emit(PassGo(self))
             self.cash += 200
         
     def resolve_space(self, space):
@@ -593,18 +1801,23 @@ class Player():
         Resolves the outcome of landing on a space, depending on the kind of
         space. 
         '''
-        self.printd(f'{self.name} lands on space {self.space} ({space.kind}).')
+        if self.events.subscribers:
+            self.events.emit(Land(self, self.space, space))
         if space.kind in ['property','utility','railroad']:
             if space.owner == self:
-                self.printd(f'{self.name} owns {space.name}.')
+                if self.events.subscribers:
+                    self.events.emit(OwnSpace(self, space))
                 return
             elif space.owner is None:
-                if self.cash-space.price > self.cash_threshold:
+                if self.strategy.buy(self, space):
                     self.buy(space)
                 else:
-                    self.printd(f'{self.name} chooses not to buy {space.name}.')
-            else:
+                    if self.events.subscribers:
+                        self.events.emit(DeclineBuy(self, space))
+            elif self.stats is None:
                 self.pay_rent(space)
+            else:
+                self.stats.call('pay_rent', self.pay_rent, space)
         elif space.kind == 'luxury_tax':
             self.pay_bank(75)
         elif space.kind == 'income_tax':
@@ -612,16 +1825,15 @@ class Player():
             self.pay_bank(amount)
         elif space.kind == 'go_to_jail':
             self.go_to_jail()
-        elif space.kind == 'community_chest':
-            self.draw_card('community')
-        elif space.kind == 'chance':
-            self.draw_card('chance')
+        elif space.kind == 'community_chest' or space.kind == 'chance':
+            self.draw_card(space.kind)
             
     def go_to_jail(self):
         '''
         Puts self in jail. 
         '''
-        self.printd(f'{self.name} goes to jail.')
+        if self.events.subscribers:
+            self.events.emit(GoToJail(self))
         self.space = 10
         self.in_jail = True
         
@@ -630,14 +1842,21 @@ class Player():
         Leaves jail and moves the given number of spaces.
         '''
         self.in_jail = False
-        self.move(spaces)
-        self.resolve_space(self.board[self.space])
+        if self.stats is None:
+            self.move(spaces)
+            self.resolve_space(self.board[self.space])
+        else:
+            self.stats.call('move', self.move, spaces)
+            self.stats.call('resolve_space', self.resolve_space, 
+                            self.board[self.space])
         self.turns_in_jail = 0       
             
     def take_turn(self):
         '''
-        Takes a turn in the game. If self is in jail, rolls to try to get out. 
-        Upon the third failed attempt, pays $50 to the bank and leaves jail. 
+        Takes a turn in the game. If self is in jail, uses a get out of jail
+        free card if it has one (and the strategy agrees), and then takes a
+        normal turn. Otherwise rolls to try to get out. Upon the third failed
+        attempt, pays $50 to the bank and leaves jail.
         
         If not in jail: rolls the dice, moves to a new space, and resolves the
         space. If the roll was a double, roll again. Upon the third double roll,
@@ -646,17 +1865,29 @@ class Player():
         At the end of the turn, attempts to unmortgage any mortgage properties
         and buy houses for properties in monopolies.
         '''
-        self.printd(f"{self.name}'s turn. (Cash={self.cash})")
+        if self.events.subscribers:
+            self.events.emit(TurnStart(self, self.cash))
+        if self.in_jail:
+            deck = self.jail_card
+            if deck is not None and self.strategy.use_jail_card(self):
+                if self.events.subscribers:
+                    self.events.emit(UseJailCard(self))
+                deck.holder = None
+                self.in_jail = False
+                self.turns_in_jail = 0
         if self.in_jail:
             self.turns_in_jail += 1
-            self.printd(f'{self.name} has been in jail for {self.turns_in_jail} turns.')
+            if self.events.subscribers:
+                self.events.emit(InJail(self, self.turns_in_jail))
             roll, double = self.roll()
             if double:
-                self.printd(f'{self.name} escapes from jail.')
+                if self.events.subscribers:
+                    self.events.emit(JailEscape(self))
                 self.leave_jail(roll)                
             else:                            
                 if self.turns_in_jail == 3:
-                    self.printd(f'{self.name} posts bail.')
+                    if self.events.subscribers:
+                        self.events.emit(PostBail(self))
                     self.pay_bank(50)
                     self.leave_jail(roll)
         else:
@@ -670,42 +1901,76 @@ class Player():
                 if double_count == 3:
                     self.go_to_jail()
                     break
-                self.move(roll)
-                self.resolve_space(self.board[self.space])
-        
-        if self.cash > self.cash_threshold:
-            for prop in self.owned:
-                if prop.mortgaged and (self.cash-1.1*0.5*prop.price)>=self.cash_threshold:
-                    self.un_mortgage(prop)
-            for color in self.monopolies:
-                props = []
-                for prop in self.owned:
-                    if isinstance(prop, Property):
-                        if prop.color == color:
-                            props.append(prop)                       
-                house_price = props[0].house_price
-                while self.cash - house_price >= self.cash_threshold and self.board.houses > 0:
-                    h = [p.houses for p in props]
-                    if all(x==h[0] for x in h):
-                        if h[0] == 5:
-                            break
-                        limit = h[0]+1
-                    else:
-                        limit = max(h)
-                    
-                    for prop in props:
-                        if prop.houses < limit and self.cash-prop.house_price >= self.cash_threshold and not prop.mortgaged:
-                            self.buy_house(prop)
+                if self.stats is None:
+                    self.move(roll)
+                    self.resolve_space(self.board[self.space])
+                else:
+                    self.stats.call('move', self.move, roll)
+                    self.stats.call('resolve_space', self.resolve_space, 
+                                    self.board[self.space])
+        
+        if self.stats is None:
+            self.develop()
+        else:
+            self.stats.call('build', self.develop)
+            
+    def develop(self):
+        '''
+        Un-mortgages properties and buys houses for monopolies, as decided by
+        the strategy.
+        '''
+        self.strategy.un_mortgage(self)
+        self.strategy.build(self)
                     
         
 class Game():
     '''
     Represents a game of monopoly, including a game board and players.
+    
+    Everything that happens in a game is emitted as an Event on Game.events.
+    Subscribe a callable (e.g. a RingBufferSink or FileSink) to receive them;
+    debug=True subscribes a ConsoleSink that prints them.
+    
+    All randomness in a game comes from its own Dice, so a game can be 
+    replayed exactly with Game.play(seed=game.seed). If no seed is given, 
+    each game draws its seed from a generator seeded with the 'seed' passed 
+    at construction.
+    
+    A game ends when all but one player are bankrupt, when it reaches 
+    'max_rounds' rounds, or in a stalemate: a window of 'stalemate_rounds' 
+    rounds with no change in ownership or houses (other than random trades)
+    in which no player's share of the total net worth moved by more than 
+    'stalemate_tolerance'. These limits are on by default (max_rounds=1000,
+    stalemate_rounds=100), so callers must check Game.outcome after play(): 
+    it is 'bankruptcy', 'max_rounds' or 'stalemate'. In the last two cases 
+    the winner is the player with the highest net worth if 
+    end_rule='net_worth', or nobody (a draw) if end_rule='draw'. Set 
+    max_rounds or stalemate_rounds to None to disable them. 
+    random_trades=False turns off Game.random_trade.
+    
+    With collect_stats=True, each game records call counts and timings of
+    its phases of play in Game.stats (see GameStats). Otherwise Game.stats
+    is None and nothing is recorded.
+
+    A game keeps all of its state in its own Board, Dice, EventBus and
+    Players; the only thing it shares is the immutable BoardSpec. Games can
+    therefore run in parallel threads, as long as no Board or Player is used
+    by two games at once (see Player.copy) and the strategies keep no
+    per-game state.
     '''
+    OUTCOMES = ('bankruptcy', 'max_rounds', 'stalemate')
+    
     def __init__(self,
                  board=None,
                  players=None,
-                 debug=False):
+                 debug=False,
+                 seed=None,
+                 max_rounds=1000,
+                 stalemate_rounds=100,
+                 stalemate_tolerance=0.05,
+                 end_rule='net_worth',
+                 random_trades=True,
+                 collect_stats=False):
 
         if board is None:
             board = build_board()
@@ -714,11 +1979,27 @@ class Game():
         self.rounds = 0
         self.debug = debug
         self.rounds_no_monopolies = 0
+        self._seeder = random.Random(seed)
+        self.seed = None
+        self.dice = Dice()
+        self.events = EventBus()
+        self._console = ConsoleSink()
+        if end_rule not in ('net_worth', 'draw'):
+            raise ValueError(f'Unknown end_rule: {end_rule}')
+        self.max_rounds = max_rounds
+        self.stalemate_rounds = stalemate_rounds
+        self.stalemate_tolerance = stalemate_tolerance
+        self.end_rule = end_rule
+        self.random_trades = random_trades
+        self.collect_stats = collect_stats
+        self.stats = None
+        self.monopoly_formed = False
+        self.outcome = None
+        self._forced_changes = 0
+        self._window_version = None
+        self._window_shares = None
+        self._no_trades = {}
 
-    def printd(self, msg):
-        if self.debug:
-            print(msg)
-        
     @property
     def player_count(self):
         count = 0
@@ -729,7 +2010,7 @@ class Game():
     
     @property
     def game_over(self):
-        if self.player_count == 1:
+        if self.outcome is not None or self.player_count == 1:
             return True
         else:
             return False
@@ -746,6 +2027,10 @@ class Game():
     def winner(self):
         if not self.game_over:
             return None
+        elif self.outcome in ('max_rounds', 'stalemate'):
+            if self.end_rule == 'draw':
+                return None
+            return max(self.active_players, key=lambda p: p.net_worth)
         else:
             for player in self.players:
                 if not player.bankrupt:
@@ -753,99 +2038,1078 @@ class Game():
                 
     @property
     def has_monopolies(self):
-        has_monopolies = False
         for player in self.players:
-            if player.monopolies:
-                has_monopolies = True
-                break
-        return has_monopolies
+            if player._monopolies:
+                return True
+        return False
                 
     def find_trades(self, buyer):
         '''
-        Attempts to find trades between players. A trade occurs if and only if
-        the following conditions are satisfied:
-            1. A player ('buyer') has at least one "almost monopoly" (see 
-               Player.wants).
-            2. Another player ('seller') owns one of the properties that
-               'buyer' wants
-            3. 'Buyer' also has a property that 'seller' wants
-            
-        If all three conditions are satisfied, then we are guaranteed the
-        following situation:
-            * 'Buyer' wants property 'X', which 'seller' owns
-            * 'Seller' wants property 'Y', which 'buyer' owns
-            
-        Now, we can swap the owership of properties 'X' and 'Y' to execute the
-        trade.
-        
-        This algorithm is not ideal. It is possible and somewhat likely that
-        the trade conditions will never occur, and thus a game will continue
-        forever. For now, this is worked around by Game.random_trade, which
-        will randomly swap the ownership of two owned properties. Game.play()
-        will execute the random trade at regular intervals, unless at least
-        one player has a monopoly.
-        '''
-        for seller in self.players:
-            if seller is buyer:
-                continue
-            buyer_wants  = [p for p in buyer.wants if p in seller.owned]
-            seller_wants = [p for p in seller.wants if p in buyer.owned]
-            if buyer_wants and seller_wants:
-                buy = None
-                sell = None
-                for b in buyer_wants:
-                    for s in seller_wants:
-                        if b.color != s.color:
-                            buy = b
-                            sell = s
-                            break
-                    if buy and sell:
-                        break
-                if buy and sell:
-                    self.printd(f"{buyer.name} trades {sell.name} to {seller.name} for {buy.name}.")
-                    buyer.trade(seller, buy=buy, sell=sell)
-                    break
+        Lets 'buyer' propose a trade (see Strategy.propose_trade) and executes
+        it if the seller accepts (Strategy.accept_trade).
+        
+        Whether a trade is proposed and accepted is taken to depend only on
+        who owns what: if buyer's last call ended without a trade and no 
+        property has changed hands since (see Board.owner_changes), the 
+        strategies are not asked again.
+        '''
+        owner_changes = self.board.owner_changes
+        if self._no_trades.get(buyer) == owner_changes:
+            return
+        trade = buyer.strategy.propose_trade(self, buyer)
+        if trade is not None:
+            seller, buy, sell = trade
+            if seller.strategy.accept_trade(seller, buyer, give=buy, get=sell):
+                if self.events.subscribers:
+                    self.events.emit(Trade(buyer, seller, buy, sell))
+                buyer.trade(seller, buy=buy, sell=sell)
+                return
+        self._no_trades[buyer] = owner_changes
     
-    def reset(self):
+    def reset(self, seed=None):
+        '''
+        Resets the board and players for a new game, seeded with 'seed' (or 
+        with the next seed from the game's own generator).
+        '''
+        if seed is None:
+            seed = self._seeder.getrandbits(64)
+        self.seed = seed
+        self.dice.seed(seed)
+        if self.debug:
+            self.events.subscribe(self._console)
+        else:
+            self.events.unsubscribe(self._console)
         self.board.reset()
+        self.stats = GameStats() if self.collect_stats else None
         for player in self.players:
             player.reset()
             player.board = self.board
             player.debug = self.debug
+            player.dice = self.dice
+            player.events = self.events
+            player.stats = self.stats
+            player.players = self.players
         self.rounds = 0
+        self.rounds_no_monopolies = 0
+        self.monopoly_formed = False
+        self.outcome = None
+        self._forced_changes = 0
+        self._window_version = None
+        self._window_shares = None
+        # Maps player to Board.owner_changes at its last find_trades without
+        # a trade
+        self._no_trades = {}
+        
+    def _net_worth_shares(self):
+        worths = [p.net_worth if not p.bankrupt else 0 for p in self.players]
+        total = sum(worths)
+        return [w / total if total > 0 else 0.0 for w in worths]
+        
+    def _stalemate(self):
+        '''
+        Called at the end of every 'stalemate_rounds' window. Returns True if
+        nothing but random trades changed ownership or houses during the 
+        window, and the players' shares of net worth stayed put.
+        '''
+        version = self.board.version - self._forced_changes
+        shares = self._net_worth_shares()
+        stalemate = (version == self._window_version and
+                     max(abs(a - b) for a, b in zip(shares, self._window_shares))
+                     < self.stalemate_tolerance)
+        self._window_version = version
+        self._window_shares = shares
+        return stalemate
         
     def play_round(self):
         self.rounds += 1
+        stats = self.stats
+        if stats is not None:
+            stats.counts['rounds'] += 1
         for player in self.players:
             if player.bankrupt:
                 continue
-            player.take_turn()
-            self.find_trades(player)
+            if stats is None:
+                player.take_turn()
+                self.find_trades(player)
+            else:
+                stats.counts['turns'] += 1
+                stats.call('take_turn', player.take_turn)
+                stats.call('find_trades', self.find_trades, player)
             if self.game_over:
                 break
             
     def random_trade(self):
-        p1, p2 = random.sample(self.active_players, k=2)
+        if self.stats is not None:
+            self.stats.counts['random_trades'] += 1
+            start = time.perf_counter()
+        rng = self.dice.rng
+        p1, p2 = rng.sample(self.active_players, k=2)
         if p1.owned and p2.owned:        
-            prop_p1 = random.choice(p1.owned)
-            prop_p2 = random.choice(p2.owned)
+            prop_p1 = rng.choice(p1.owned)
+            prop_p2 = rng.choice(p2.owned)
+            # Random trades don't count as progress for stalemate detection
+            version = self.board.version
             p1.trade(p2, buy=prop_p2, sell=prop_p1)
+            self._forced_changes += self.board.version - version
+        if self.stats is not None:
+            self.stats.times['random_trade'] += time.perf_counter() - start
+            self.stats.calls['random_trade'] += 1
                
-    def play(self):
-        self.reset()        
+    def to_record(self, n=0):
+        '''
+        Returns a GameRecord of the finished game, numbered 'n'.
+        '''
+        winner = self.winner
+        return GameRecord(n, self.seed, 
+                          -1 if winner is None else self.players.index(winner),
+                          self.outcome, self.rounds, self.monopoly_formed,
+                          tuple(p.cash for p in self.players),
+                          tuple(len(p._owned) for p in self.players))
+        
+    def snapshot(self):
+        '''
+        Returns a GameSnapshot of the complete state of the game: board, 
+        players, round counters and dice. Restore it with Game.restore().
+        '''
+        seats = {player: seat for seat, player in enumerate(self.players)}
+        board = self.board
+        return GameSnapshot(
+            tuple(-1 if p is None else seats[p] for p in board.owners),
+            tuple(board.house_counts),
+            tuple(board.mortgaged),
+            board.houses,
+            board.version,
+            tuple((p.cash, p.space, p.bankrupt, p.in_jail, p.turns_in_jail)
+                  for p in self.players),
+            (self.rounds, self.rounds_no_monopolies, self.monopoly_formed,
+             self.outcome, self.seed, self._forced_changes, 
+             self._window_version, self._window_shares),
+            self.dice.getstate(),
+            tuple((tuple(deck.order), deck.cursor,
+                   -1 if deck.holder is None else seats[deck.holder])
+                  for deck in (board.chance, board.community_chest)))
+    
+    def restore(self, snapshot, seed=None):
+        '''
+        Puts the game back in the state of a snapshot taken from this game (or
+        from a game with the same board and number of players). Play then
+        continues exactly as it did after the snapshot was taken, unless a 
+        'seed' is given, in which case the dice are re-seeded with it, e.g. 
+        for independent rollouts from the same position.
+        '''
+        board = self.board
+        seats = (*self.players, None)
+        for player in self.players:
+            player._clear_owned()
+        board.owners[:] = [seats[seat] for seat in snapshot.owners]
+        board.house_counts[:] = snapshot.house_counts
+        board.mortgaged[:] = snapshot.mortgaged
+        board.houses = snapshot.houses
+        board.version = snapshot.version
+        board.owner_changes += 1
+        for index, player in enumerate(board.owners):
+            if player is not None:
+                player._add_owned(board[index])
+        board.update_all_rents()
+        for deck, (order, cursor, holder) in zip(
+                (board.chance, board.community_chest), snapshot.decks):
+            deck.order[:] = order
+            deck.cursor = cursor
+            deck.holder = seats[holder]
+        for player, state in zip(self.players, snapshot.players):
+            (player.cash, player.space, player.bankrupt, player.in_jail,
+             player.turns_in_jail) = state
+        (self.rounds, self.rounds_no_monopolies, self.monopoly_formed,
+         self.outcome, self.seed, self._forced_changes, 
+         self._window_version, self._window_shares) = snapshot.game
+        self._no_trades = {}
+        self.dice.setstate(snapshot.dice)
+        if seed is not None:
+            self.dice.seed(seed)
+            self.seed = seed
+            
+    def play(self, seed=None):
+        '''
+        Plays a new game, seeded with 'seed' (see Game.reset()).
+        '''
+        self.reset(seed)
+        self.play_out()
+        
+    def play_out(self):
+        '''
+        Plays the current game to the end from wherever it is, e.g. after 
+        Game.restore().
+        '''
+        start = time.perf_counter()
         while not self.game_over:
             
-            # Random trades to prevent infinite games
-            if self.rounds_no_monopolies%10==0 and self.rounds_no_monopolies>0:
-                self.random_trade()
-            if self.rounds > 0 and self.rounds % 50 == 0:
-                self.random_trade()
+            # Random trades to shake up stuck games
+            if self.random_trades:
+                if self.rounds_no_monopolies%10==0 and self.rounds_no_monopolies>0:
+                    self.random_trade()
+                if self.rounds > 0 and self.rounds % 50 == 0:
+                    self.random_trade()
                 
             self.play_round()
             if not self.has_monopolies:
                 self.rounds_no_monopolies += 1
             else:
                 self.rounds_no_monopolies = 0
+                self.monopoly_formed = True
+                
+            if self.player_count == 1:
+                break
+            if self.max_rounds is not None and self.rounds >= self.max_rounds:
+                self.outcome = 'max_rounds'
+            elif (self.stalemate_rounds is not None and 
+                  self.rounds % self.stalemate_rounds == 0 and self._stalemate()):
+                self.outcome = 'stalemate'
+                
+        if self.outcome is None:
+            self.outcome = 'bankruptcy'
+        if self.stats is not None:
+            self.stats.times['play'] += time.perf_counter() - start
+            self.stats.calls['play'] += 1
+        if self.events.subscribers:
+            self.events.emit(GameOver(self.winner, self.rounds, self.outcome))
+            
+class GameRecord():
+    '''
+    Compact summary of one finished game, as yielded by iter_games(): its 
+    number and seed, the winner's seat (-1 for a draw), how the game ended 
+    (see Game.outcome), its length in rounds, whether any player held a 
+    monopoly at the end of some round, and each seat's final cash and number
+    of properties.
+    
+    Games stop at Game's round and stalemate limits by default, so not every
+    winner won by bankruptcy: filter on outcome == 'bankruptcy' to keep only
+    games that were played out.
+    '''
+    __slots__ = ('n', 'seed', 'winner', 'outcome', 'rounds', 'monopoly',
+                 'cash', 'properties')
+    
+    def __init__(self, n, seed, winner, outcome, rounds, monopoly, cash, 
+                 properties):
+        self.n = n
+        self.seed = seed
+        self.winner = winner
+        self.outcome = outcome
+        self.rounds = rounds
+        self.monopoly = monopoly
+        self.cash = cash
+        self.properties = properties
+        
+    def __repr__(self):
+        return (f'GameRecord(n={self.n}, winner={self.winner}, '+
+                f'outcome={self.outcome}, rounds={self.rounds})')
+        
+    def row(self):
+        '''
+        Returns the record as one flat tuple, in the column order of 
+        write_games().
+        '''
+        return (self.n, self.seed, self.winner, self.outcome, self.rounds,
+                self.monopoly) + self.cash + self.properties
+
+class GameSnapshot():
+    '''
+    The complete state of a Game at one point in time, as returned by 
+    Game.snapshot(). It only holds tuples of numbers (players are referred 
+    to by seat, unowned spaces by -1), so a game can be restored from the 
+    same snapshot any number of times.
+    
+    A snapshot taken between rounds (e.g. after Game.play_round()) resumes
+    exactly; Game.play_out() always starts with a new round.
+    '''
+    __slots__ = ('owners', 'house_counts', 'mortgaged', 'houses', 'version',
+                 'players', 'game', 'dice', 'decks')
+
+    def __init__(self, owners, house_counts, mortgaged, houses, version,
+                 players, game, dice, decks):
+        self.owners = owners
+        self.house_counts = house_counts
+        self.mortgaged = mortgaged
+        self.houses = houses
+        self.version = version
+        self.players = players
+        self.game = game
+        self.dice = dice
+        self.decks = decks
+        
+    def __repr__(self):
+        return (f'GameSnapshot(rounds={self.game[0]}, '+
+                f'cash={[p[0] for p in self.players]})')
+
+
+class SimulationResults():
+    '''
+    Aggregated outcome of many simulated games: win counts per seat, draws,
+    how each game ended (see Game.outcome) and a histogram of game lengths 
+    (in rounds). Results from separate batches can be combined with merge().
+    If the games were played with collect_stats=True, their GameStats are 
+    added up in SimulationResults.stats (None otherwise).
+    '''
+    def __init__(self, names=None, seed=None):
+        self.names = list(names) if names is not None else []
+        self.seed = seed
+        self.wins = [0] * len(self.names)
+        self.draws = 0
+        self.outcomes = Counter()
+        self.game_lengths = Counter()
+        self.stats = None
+        
+    def __str__(self):
+        out = f'{self.n_games} games (seed={self.seed})\n'
+        for name, wins in zip(self.names, self.wins):
+            out += f'{name} won {wins} out of {self.n_games} games.\n'
+        if self.draws:
+            out += f'{self.draws} games were draws.\n'
+        capped = self.outcomes['max_rounds'] + self.outcomes['stalemate']
+        if capped:
+            out += (f"{self.outcomes['max_rounds']} games hit the round limit and "
+                    f"{self.outcomes['stalemate']} ended in a stalemate.\n")
+        out += f'Average length of game is {round(self.mean_length)} rounds.'
+        return out
+    
+    def __repr__(self):
+        return (f'SimulationResults(names={self.names},'+
+                f'seed={self.seed},'+
+                f'wins={self.wins},'+
+                f'n_games={self.n_games})')
+        
+    @property
+    def n_games(self):
+        return sum(self.game_lengths.values())
+    
+    @property
+    def win_counts(self):
+        '''
+        Returns a dict mapping each player name to its number of wins.
+        '''
+        return dict(zip(self.names, self.wins))
+    
+    @property
+    def win_rates(self):
+        '''
+        Returns a dict mapping each player name to its fraction of wins.
+        '''
+        n = self.n_games
+        return {name: (wins/n if n else 0.0) 
+                for name, wins in zip(self.names, self.wins)}
+    
+    @property
+    def capped_rate(self):
+        '''
+        Returns the fraction of games that did not end in bankruptcy.
+        '''
+        n = self.n_games
+        return (n - self.outcomes['bankruptcy']) / n if n else 0.0
+    
+    @property
+    def mean_length(self):
+        n = self.n_games
+        if n == 0:
+            return 0.0
+        return sum(k*v for k, v in self.game_lengths.items()) / n
+    
+    @property
+    def min_length(self):
+        return min(self.game_lengths) if self.game_lengths else None
+    
+    @property
+    def max_length(self):
+        return max(self.game_lengths) if self.game_lengths else None
+    
+    def record(self, game):
+        '''
+        Adds the outcome of a finished game to the results.
+        '''
+        winner = game.winner
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[game.players.index(winner)] += 1
+        self.outcomes[game.outcome] += 1
+        self.game_lengths[game.rounds] += 1
+        if game.stats is not None:
+            if self.stats is None:
+                self.stats = GameStats()
+            self.stats.merge(game.stats)
+        
+    def merge(self, other):
+        '''
+        Adds the counts of another SimulationResults (for the same seating)
+        into self. Returns self.
+        '''
+        if other.names != self.names:
+            raise ValueError("Can't merge results for different players!")
+        for i, wins in enumerate(other.wins):
+            self.wins[i] += wins
+        self.draws += other.draws
+        self.outcomes.update(other.outcomes)
+        self.game_lengths.update(other.game_lengths)
+        if other.stats is not None:
+            if self.stats is None:
+                self.stats = GameStats()
+            self.stats.merge(other.stats)
+        return self
+    
+# A game's seed is its base seed in the high 32 bits and its number in the
+# low 32 bits, so that distinct (seed, n) pairs never share a game seed
+SEED_BITS = 32
+
+def game_seed(seed, n):
+    '''
+    Returns the seed of game number n in a simulation run with the given seed.
+    Every game is seeded independently, so a game's outcome does not depend 
+    on which worker plays it or on the games played before it. Both seed 
+    and n must be in [0, 2**32), so game seeds fit in 64 bits.
+    '''
+    if seed >> SEED_BITS or n >> SEED_BITS:
+        raise ValueError(f'Base seed and game number must be in '
+                         f'[0, 2**{SEED_BITS}): {seed}, {n}')
+    return (seed << SEED_BITS) + n
+
+def _check_seed(seed, n_games):
+    '''
+    Raises ValueError unless 'seed' is a valid base seed for n_games games
+    (see game_seed()).
+    '''
+    if not 0 <= seed < 2**SEED_BITS:
+        raise ValueError(f'Base seed must be in [0, 2**{SEED_BITS}): {seed}')
+    if n_games > 2**SEED_BITS:
+        raise ValueError(f'At most 2**{SEED_BITS} games per base seed')
+
+# Ways to run batches of games in parallel
+BACKENDS = ('process', 'thread')
+
+def _executor(backend, workers):
+    '''
+    Returns a pool of 'workers' worker processes or threads. Threads only 
+    play games in parallel on a free-threaded (no GIL) build of Python, but
+    skip the startup of a process and the pickling of every batch.
+    '''
+    # Imported here to keep 'import monopoly' fast for single-game use
+    if backend == 'process':
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=workers)
+    elif backend == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f'Unknown backend: {backend}')
+
+def _batch_game(players, board, game_options):
+    '''
+    Returns a Game of copies of 'players' on a new board with the same spec
+    as 'board', so that a batch shares no game state with the caller or with
+    batches running in other threads.
+    '''
+    board = build_board() if board is None else Board(board.spec)
+    return Game(board=board, players=[p.copy() for p in players], 
+                **game_options)
+
+def _simulate_batch(players, board, seed, start, stop, game_options):
+    '''
+    Plays games start, start+1, ..., stop-1 of a simulation. Runs inside a
+    worker process or thread, so it must stay a module-level function.
+    '''
+    game = _batch_game(players, board, game_options)
+    results = SimulationResults([p.name for p in players], seed)
+    for n in range(start, stop):
+        game.play(seed=game_seed(seed, n))
+        results.record(game)
+    return results
+    
+def simulate(players, n_games, workers=None, seed=None, board=None,
+             batch_size=None, backend='process', **game_options):
+    '''
+    Plays n_games games between the given players, spread over a pool of
+    worker processes (or threads), and returns the merged SimulationResults.
+
+    Parameters
+    ----------
+    players : list of Player
+        The seating for every game. Every batch plays with its own copies
+        (see Player.copy), so the objects are not modified.
+    n_games : int
+    workers : int, optional
+        Number of workers. Defaults to os.cpu_count(). With workers=1 the 
+        games are played in the calling thread.
+    seed : int, optional
+        Base seed of the run, in [0, 2**32). Results are identical for the same seed
+        regardless of the number of workers. A random seed is drawn (and
+        stored on the results) if none is given.
+    board : Board, optional
+        Board to play on. Every batch gets a new Board with the same spec;
+        built with build_board() if not given.
+    batch_size : int, optional
+        Number of games handed to a worker at a time.
+    backend : str, optional
+        'process' for a pool of worker processes, or 'thread' for a pool of
+        threads in this process, which share the BoardSpec. Threads only run
+        in parallel on a free-threaded build of Python. The results are the
+        same for either backend.
+    **game_options
+        Passed on to Game(), e.g. max_rounds, end_rule or collect_stats.
 
-        self.printd(f'Winner is {self.winner.name}!')
+    Returns
+    -------
+    results : SimulationResults
+
+    '''
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend: {backend}')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(SEED_BITS)
+    _check_seed(seed, n_games)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, min(1000, -(-n_games // (4*workers))))
+    batches = [(start, min(start+batch_size, n_games)) 
+               for start in range(0, n_games, batch_size)]
+    
+    results = SimulationResults([p.name for p in players], seed)
+    if workers == 1:
+        for start, stop in batches:
+            results.merge(_simulate_batch(players, board, seed, start, stop,
+                                          game_options))
+        return results
+    
+    with _executor(backend, workers) as pool:
+        futures = [pool.submit(_simulate_batch, players, board, seed, start, stop,
+                               game_options)
+                   for start, stop in batches]
+        for future in futures:
+            results.merge(future.result())
+    return results
+
+def wilson_interval(wins, n, z=1.96):
+    '''
+    Returns the Wilson score interval (low, high) of a win rate of 'wins' 
+    out of 'n', at the confidence level of the normal quantile 'z' (1.96 for
+    95%). Unlike the normal approximation, it stays within [0, 1] and works
+    for rates near 0 or 1.
+    '''
+    if n == 0:
+        return (0.0, 1.0)
+    p = wins / n
+    denom = 1 + z*z/n
+    center = (p + z*z/(2*n)) / denom
+    half = z * (p*(1-p)/n + z*z/(4*n*n))**0.5 / denom
+    return (max(0.0, center - half), min(1.0, center + half))
+
+class TournamentResults():
+    '''
+    Outcome of a tournament(): the SimulationResults of every seating, and 
+    each strategy's wins and games (one per seat it took in a game) over 
+    all of them. A strategy that is no better than the others wins 1/seats 
+    of its games.
+    '''
+    def __init__(self, names, seed=None):
+        self.names = list(names)
+        self.seed = seed
+        self.seatings = {}
+        
+    def __str__(self):
+        out = (f'{sum(r.n_games for r in self.seatings.values())} games in '
+               f'{len(self.seatings)} seatings (seed={self.seed})\n')
+        width = max(len(name) for name in self.names)
+        for name in sorted(self.names, key=self.win_rate, reverse=True):
+            low, high = self.confidence_interval(name)
+            out += (f'{name:<{width}}  win rate {self.win_rate(name):6.1%}  '
+                    f'95% CI [{low:6.1%}, {high:6.1%}]  '
+                    f'({self.wins[name]} of {self.games[name]})\n')
+        return out.rstrip('\n')
+    
+    def __repr__(self):
+        return (f'TournamentResults(names={self.names},'+
+                f'seed={self.seed},'+
+                f'seatings={len(self.seatings)})')
         
+    def add(self, seating, results):
+        '''
+        Adds the SimulationResults of games played with the given seating (a
+        tuple of strategy indices, one per seat).
+        '''
+        if seating in self.seatings:
+            self.seatings[seating].merge(results)
+        else:
+            self.seatings[seating] = results
+    
+    @property
+    def wins(self):
+        wins = Counter({name: 0 for name in self.names})
+        for seating, results in self.seatings.items():
+            for k, seat_wins in zip(seating, results.wins):
+                wins[self.names[k]] += seat_wins
+        return wins
+    
+    @property
+    def games(self):
+        games = Counter({name: 0 for name in self.names})
+        for seating, results in self.seatings.items():
+            for k in seating:
+                games[self.names[k]] += results.n_games
+        return games
+        
+    def win_rate(self, name):
+        games = self.games[name]
+        return self.wins[name] / games if games else 0.0
+    
+    def confidence_interval(self, name, z=1.96):
+        '''
+        Returns the Wilson interval of the win rate of a strategy (see 
+        wilson_interval()).
+        '''
+        return wilson_interval(self.wins[name], self.games[name], z)
+
+def tournament(strategies, n_games, seats=4, seatings=None, workers=None, 
+               seed=None, board=None, batch_size=None, backend='process', 
+               **game_options):
+    '''
+    Plays n_games games for every seating of the given strategies, in a 
+    pool of workers like simulate(), and returns their win rates
+    with confidence intervals. Every seating plays the same game seeds.
+
+    Parameters
+    ----------
+    strategies : list of Strategy
+        Strategies with distinct names.
+    n_games : int
+        Number of games per seating.
+    seats : int, optional
+        Number of players per game.
+    seatings : list of tuple, optional
+        Seatings to play, each a tuple of indices into 'strategies', one per
+        seat. By default every ordered choice of 'seats' distinct strategies,
+        or, with fewer strategies than seats, every assignment of strategies
+        to seats that mixes at least two of them.
+    workers, seed, board, batch_size, backend, **game_options
+        As in simulate().
+
+    Returns
+    -------
+    results : TournamentResults
+
+    '''
+    from itertools import permutations, product
+    names = [strategy.name for strategy in strategies]
+    if len(set(names)) != len(names):
+        raise ValueError('Strategies must have distinct names!')
+    if seatings is None:
+        if len(strategies) >= seats:
+            seatings = list(permutations(range(len(strategies)), seats))
+        else:
+            seatings = [s for s in product(range(len(strategies)), repeat=seats)
+                        if len(set(s)) > 1]
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend: {backend}')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(SEED_BITS)
+    _check_seed(seed, n_games)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, min(1000, -(-n_games*len(seatings) // (4*workers))))
+    
+    tasks = []
+    for seating in seatings:
+        seating = tuple(seating)
+        players = [Player(name=f'{names[k]}@{seat}', strategy=strategies[k])
+                   for seat, k in enumerate(seating)]
+        for start in range(0, n_games, batch_size):
+            tasks.append((seating, (players, board, seed, start, 
+                                    min(start+batch_size, n_games), 
+                                    game_options)))
+    
+    results = TournamentResults(names, seed)
+    if workers == 1:
+        for seating, args in tasks:
+            results.add(seating, _simulate_batch(*args))
+        return results
+    
+    with _executor(backend, workers) as pool:
+        futures = [(seating, pool.submit(_simulate_batch, *args)) 
+                   for seating, args in tasks]
+        for seating, future in futures:
+            results.add(seating, future.result())
+    return results
+
+class ComparisonResults():
+    '''
+    Outcome of compare(): the number of game pairs played, the wins of each
+    candidate, the always-valid confidence interval of the difference of 
+    their win rates (a minus b) and the decision: 'a' or 'b' if that 
+    candidate is significantly better, 'negligible' if the difference is 
+    surely within the margin, or 'inconclusive' if the budget ran out first.
+    '''
+    def __init__(self, names, seed, alpha, margin):
+        self.names = names
+        self.seed = seed
+        self.alpha = alpha
+        self.margin = margin
+        self.n_pairs = 0
+        self.wins_a = 0
+        self.wins_b = 0
+        self.interval = (-1.0, 1.0)
+        self.decision = 'inconclusive'
+        
+    def __str__(self):
+        a, b = self.names
+        low, high = self.interval
+        if self.decision in ('a', 'b'):
+            verdict = f'{self.names[self.decision == "b"]} is better'
+        else:
+            verdict = self.decision
+        return (f'{a} vs {b} after {self.n_pairs} game pairs (seed={self.seed}): '
+                f'{verdict}\n'
+                f'win rates {self.rate_a:.1%} vs {self.rate_b:.1%}, difference '
+                f'{self.difference:+.1%}, {1-self.alpha:.0%} CI [{low:+.1%}, {high:+.1%}]')
+    
+    def __repr__(self):
+        return (f'ComparisonResults(names={self.names},'+
+                f'decision={self.decision},'+
+                f'n_pairs={self.n_pairs})')
+        
+    @property
+    def n_games(self):
+        return 2 * self.n_pairs
+    
+    @property
+    def rate_a(self):
+        return self.wins_a / self.n_pairs if self.n_pairs else 0.0
+    
+    @property
+    def rate_b(self):
+        return self.wins_b / self.n_pairs if self.n_pairs else 0.0
+    
+    @property
+    def difference(self):
+        return self.rate_a - self.rate_b
+    
+    def update(self, wins_a, wins_b, n_pairs, rho):
+        '''
+        Adds a batch of game pairs and updates the interval and decision.
+        
+        The per-pair differences (win of a) - (win of b) lie in [-1, 1], so 
+        they are sub-Gaussian with variance proxy 1, and Robbins' normal 
+        mixture boundary gives a confidence sequence for their mean: with 
+        probability 1-alpha it holds at every n simultaneously, so it may be
+        checked after every batch. 'rho' sets the number of pairs (about 
+        rho) at which the interval is tightest.
+        '''
+        self.wins_a += wins_a
+        self.wins_b += wins_b
+        self.n_pairs += n_pairs
+        n = self.n_pairs
+        half = ((n + rho) * math.log((n + rho) / (rho * self.alpha**2)))**0.5 / n
+        d = self.difference
+        self.interval = (max(-1.0, d - half), min(1.0, d + half))
+        low, high = self.interval
+        if low > 0:
+            self.decision = 'a'
+        elif high < 0:
+            self.decision = 'b'
+        elif -self.margin < low and high < self.margin:
+            self.decision = 'negligible'
+        return self.decision != 'inconclusive'
+
+def _compare_batch(a, b, opponents, board, seed, start, stop, game_options):
+    '''
+    Plays the game pairs start, ..., stop-1 of compare() and returns the 
+    wins of a and of b. Pair n plays seed game_seed(seed, n) once with each
+    candidate, at seat n % seats, against the same opponents.
+    '''
+    seats = len(opponents) + 1
+    games = {}
+    for key, strategy in (('a', a), ('b', b)):
+        for seat in range(seats):
+            players = [Player(name=f'opponent{i}', strategy=opp) 
+                       for i, opp in enumerate(opponents)]
+            players.insert(seat, Player(name=key, strategy=strategy))
+            games[key, seat] = _batch_game(players, board, game_options)
+    wins = {'a': 0, 'b': 0}
+    for n in range(start, stop):
+        seat = n % seats
+        for key in wins:
+            game = games[key, seat]
+            game.play(seed=game_seed(seed, n))
+            if game.winner is game.players[seat]:
+                wins[key] += 1
+    return wins['a'], wins['b']
+
+def compare(a, b, opponents=None, alpha=0.05, margin=0.02, batch_size=200, 
+            max_games=100000, rho=500, workers=1, seed=None, board=None, 
+            backend='process', **game_options):
+    '''
+    Finds out which of two strategies wins more often, playing only as many
+    games as needed. Games are played in pairs: the same seed once with 'a'
+    and once with 'b' in the same seat against the same opponents, which 
+    cancels most of the luck of the dice. After each batch of pairs, an 
+    always-valid confidence interval for the difference in win rate is 
+    updated (see ComparisonResults.update), and play stops as soon as it 
+    excludes 0 or lies within +-margin.
+
+    Parameters
+    ----------
+    a, b : Strategy or number
+        The candidates. A number is taken as the cash_threshold of the
+        default Strategy.
+    opponents : list of Strategy, optional
+        The other seats. Three default strategies if not given.
+    alpha : float, optional
+        Error probability of the decision.
+    margin : float, optional
+        Differences in win rate smaller than this are negligible.
+    batch_size : int, optional
+        Number of game pairs between checks.
+    max_games : int, optional
+        Budget: at most this many games are played (two per pair).
+    rho : float, optional
+        Tuning of the confidence sequence; it is tightest at around 'rho' 
+        pairs.
+    workers : int, optional
+        Number of workers. Batches are still checked in order, so the result
+        does not depend on it.
+    seed, board, backend, **game_options
+        As in simulate().
+
+    Returns
+    -------
+    results : ComparisonResults
+
+    '''
+    if not isinstance(a, Strategy):
+        a = Strategy(cash_threshold=a)
+    if not isinstance(b, Strategy):
+        b = Strategy(cash_threshold=b)
+    if opponents is None:
+        opponents = [DEFAULT_STRATEGY] * 3
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend: {backend}')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(SEED_BITS)
+    _check_seed(seed, max_games // 2)
+    results = ComparisonResults((a.name, b.name), seed, alpha, margin)
+    max_pairs = max_games // 2
+    batches = [(start, min(start+batch_size, max_pairs)) 
+               for start in range(0, max_pairs, batch_size)]
+    args = (a, b, opponents, board, seed)
+    
+    if workers == 1:
+        for start, stop in batches:
+            wins_a, wins_b = _compare_batch(*args, start, stop, game_options)
+            if results.update(wins_a, wins_b, stop - start, rho):
+                break
+        return results
+    
+    batches = iter(batches)
+    with _executor(backend, workers) as pool:
+        pending = deque()
+        def submit():
+            batch = next(batches, None)
+            if batch is not None:
+                future = pool.submit(_compare_batch, *args, *batch, game_options)
+                pending.append((batch, future))
+        for _ in range(2*workers):
+            submit()
+        while pending:
+            (start, stop), future = pending.popleft()
+            wins_a, wins_b = future.result()
+            if results.update(wins_a, wins_b, stop - start, rho):
+                for _, future in pending:
+                    future.cancel()
+                break
+            submit()
+    return results
+
+def _record_batch(players, board, seed, start, stop, game_options):
+    '''
+    Plays games start, ..., stop-1 and returns their GameRecords. Runs inside
+    a worker process or thread, like _simulate_batch.
+    '''
+    game = _batch_game(players, board, game_options)
+    records = []
+    for n in range(start, stop):
+        game.play(seed=game_seed(seed, n))
+        records.append(game.to_record(n))
+    return records
+
+def iter_games(players, n_games, seed=None, board=None, workers=1, 
+               batch_size=1000, backend='process', **game_options):
+    '''
+    Plays n_games games like simulate(), and yields one GameRecord per game,
+    in order. Only a few batches of records exist at any time, so memory 
+    use does not grow with n_games.
+    
+    With workers > 1, batches of batch_size games are played in a pool of 
+    worker processes (or threads, with backend='thread'), at most two 
+    batches per worker ahead of the consumer. The records are the same for
+    any number and kind of workers and the same base seed. As in 
+    simulate(), a random base seed is drawn if none is given; every record
+    keeps its game's seed, from which Game.play(seed=...) replays it.
+    '''
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend: {backend}')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(SEED_BITS)
+    _check_seed(seed, n_games)
+    if workers == 1:
+        game = _batch_game(players, board, game_options)
+        for n in range(n_games):
+            game.play(seed=game_seed(seed, n))
+            yield game.to_record(n)
+        return
+
+    starts = iter(range(0, n_games, batch_size))
+    with _executor(backend, workers) as pool:
+        pending = deque()
+        def submit():
+            start = next(starts, None)
+            if start is not None:
+                pending.append(pool.submit(_record_batch, players, board, seed,
+                                           start, min(start+batch_size, n_games),
+                                           game_options))
+        for _ in range(2*workers):
+            submit()
+        while pending:
+            records = pending.popleft().result()
+            submit()
+            yield from records
+
+def _game_columns(n_players):
+    return (['game', 'seed', 'winner', 'outcome', 'rounds', 'monopoly'] +
+            [f'cash_{i}' for i in range(n_players)] +
+            [f'properties_{i}' for i in range(n_players)])
+
+def _arrow_schema(n_players):
+    import pyarrow as pa
+    types = ([pa.uint64(), pa.uint64(), pa.int8(), pa.string(), pa.int32(), 
+              pa.bool_()] + [pa.int32()] * n_players + [pa.int16()] * n_players)
+    return pa.schema(list(zip(_game_columns(n_players), types)))
+
+def write_games(records, path, format=None, chunk_size=65536):
+    '''
+    Streams GameRecords (e.g. from iter_games()) to a file, chunk_size 
+    records at a time, so that memory use stays flat however many games 
+    there are. There is one column per field, and one cash_<seat> and 
+    properties_<seat> column per seat.
+    
+    Parameters
+    ----------
+    records : iterable of GameRecord
+    path : str
+    format : str, optional
+        'csv', 'arrow' (Arrow IPC file, which can be memory-mapped, see 
+        read_games()) or 'parquet' (one row group per chunk). Taken from the
+        file extension if not given (.csv, .arrow/.feather/.ipc, .parquet).
+        Arrow and Parquet need pyarrow.
+    chunk_size : int, optional
+        Number of records per chunk (Arrow record batch, Parquet row group).
+        
+    Returns
+    -------
+    n : int
+        Number of records written.
+
+    '''
+    if format is None:
+        format = _file_format(path)
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        raise ValueError('No records to write!')
+    n_players = len(first.cash)
+    n = 0
+    
+    def chunks():
+        chunk = [first.row()]
+        for record in records:
+            chunk.append(record.row())
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    if format == 'csv':
+        import csv
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(_game_columns(n_players))
+            for chunk in chunks():
+                writer.writerows(chunk)
+                n += len(chunk)
+        return n
+    
+    # Imported here so that pyarrow is only needed for these formats
+    import pyarrow as pa
+    schema = _arrow_schema(n_players)
+    if format == 'arrow':
+        import pyarrow.ipc
+        writer = pa.ipc.new_file(path, schema)
+    elif format == 'parquet':
+        import pyarrow.parquet
+        writer = pa.parquet.ParquetWriter(path, schema)
+    else:
+        raise ValueError(f'Unknown format: {format}')
+    with writer:
+        for chunk in chunks():
+            columns = [pa.array(column, type=field.type) 
+                       for column, field in zip(zip(*chunk), schema)]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            n += len(chunk)
+    return n
+
+def read_games(path, format=None):
+    '''
+    Opens a file written by write_games() as a pyarrow.Table. Arrow files 
+    are memory-mapped, so nothing is read until a column is used; Parquet 
+    and CSV files are read into memory.
+    '''
+    import pyarrow as pa
+    if format is None:
+        format = _file_format(path)
+    if format == 'arrow':
+        import pyarrow.ipc
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+    elif format == 'parquet':
+        import pyarrow.parquet
+        return pa.parquet.read_table(path, memory_map=True)
+    elif format == 'csv':
+        import pyarrow.csv
+        return pa.csv.read_csv(path)
+    raise ValueError(f'Unknown format: {format}')
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    formats = {'.csv': 'csv', '.arrow': 'arrow', '.feather': 'arrow',
+               '.ipc': 'arrow', '.parquet': 'parquet'}
+    if ext not in formats:
+        raise ValueError(f'Unknown file extension: {ext}')
+    return formats[ext]
+
+def profile_run(func, *args, sort='cumulative', limit=25, **kwargs):
+    '''
+    Runs func(*args, **kwargs) under cProfile and prints the 'limit' most
+    expensive functions, sorted by 'sort' (see pstats.Stats.sort_stats). For
+    example, profile_run(game.play, seed=1) or 
+    profile_run(simulate, players, 200, workers=1).
+    
+    Returns
+    -------
+    result
+        Whatever func returned.
+    stats : pstats.Stats
+    
+    '''
+    # Imported here since profiling is only for diagnosis
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    stats = pstats.Stats(profiler)
+    if limit:
+        stats.sort_stats(sort).print_stats(limit)
+    return result, stats
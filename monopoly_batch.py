@@ -0,0 +1,1115 @@
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:   Joshua W. Johnstone
+NAME:     monopoly_batch.py
+PURPOSE:  Simulate many games of Monopoly at once, in lockstep, with NumPy
+
+The games are stored as arrays (struct-of-arrays) instead of Space and
+Player objects, and every player turn is applied to all running games at
+once with vectorized operations. The rules are those of
+monopoly.Player.take_turn, monopoly.Player.resolve_space, monopoly.Strategy
+and monopoly.Game.play, stalemate detection included. Each turn only touches
+the games still running and the board columns it needs: house building is
+looked up in a table of color group states, and per-player counters of
+mortgages and of monopolies spare scans of the whole board. Use
+compare_with_reference() to check the outcome distributions against
+monopoly.simulate(), and 'python benchmark.py --batch' to compare their
+speed.
+
+Objects:
+    BatchGame
+
+Functions:
+    compare_with_reference
+"""
+
+import copy
+
+import numpy as np
+import monopoly
+
+NO_OWNER = -1
+# Extra board column used to pad the 2-property color groups to 3 members.
+# It is never owned, has no houses and is never mortgaged.
+PAD = 40
+PAD_OWNER = -2
+
+# Decks and card actions (see monopoly.Player.draw_card)
+CHANCE, COMMUNITY_CHEST = 0, 1
+CARD_ACTIONS = ('advance', 'railroad', 'utility', 'back', 'jail', 'collect', 
+                'pay', 'repairs', 'pay_each', 'collect_each', 'jail_free')
+(ADVANCE, RAILROAD, UTILITY, BACK, JAIL, COLLECT, PAY, REPAIRS, PAY_EACH,
+ COLLECT_EACH, JAIL_FREE) = range(len(CARD_ACTIONS))
+
+def _build_table(size):
+    '''
+    Tabulates Strategy.plan_build for a color group of 'size' properties.
+    The state of a group is numbered 
+        sum(houses[i] * 6**i) + 6**size * sum(mortgaged[i] * 2**i)
+    over its members i, in board order.
+
+    Returns
+    -------
+    adds : (6**size * 2**size, 5*size + 1, size) array
+        adds[state, k] is the number of houses each member gets when k 
+        houses are bought on a group in that state.
+    lengths : (6**size * 2**size,) array
+        Number of houses that can be bought on the group, in each state.
+
+    '''
+    n_states = 6**size * 2**size
+    adds = np.zeros((n_states, 5*size + 1, size), dtype=np.int64)
+    lengths = np.zeros(n_states, dtype=np.int64)
+    for state in range(n_states):
+        counts = [state // 6**i % 6 for i in range(size)]
+        mortgaged = [state // 6**size >> i & 1 for i in range(size)]
+        order = []
+        while True:
+            top = max(counts)
+            limit = top + 1 if min(counts) == top else top
+            if limit > 5:
+                break
+            progress = False
+            for i in range(size):
+                if counts[i] < limit and not mortgaged[i]:
+                    order.append(i)
+                    counts[i] += 1
+                    progress = True
+            if not progress:
+                break
+        lengths[state] = len(order)
+        for k, i in enumerate(order, 1):
+            adds[state, k:, i] += 1
+    return adds, lengths
+
+class BatchGame():
+    '''
+    Plays n_games games of Monopoly in lockstep. Each seat is described only
+    by its cash threshold, as in monopoly.Player.
+    
+    The games are played in 'width' slots (all n_games at once by default, 
+    at most MAX_WIDTH). When a game ends, its slot starts the next game
+    right away, so every round works on full arrays even though game 
+    lengths vary widely, and memory use does not grow with n_games.
+
+    State arrays of the slots (W = width, P = players, columns = board 
+    spaces + PAD):
+        cash, space, bankrupt, in_jail, turns_in_jail : (P, W)
+        mortgage_counts, no_trades                    : (P, W)
+        owner, houses, mortgaged                      : (W, 41)
+        color_counts                                  : (P, W, 11)
+        deck_order                                    : (W, 2, 16)
+        deck_cursor, deck_holder                      : (W, 2)
+        bank_houses, rounds, rounds_no_monopolies     : (W,)
+        version, window_version                       : (W,)
+        window_shares                                 : (W, P)
+        game, over                                    : (W,)
+        
+    game[w] is the number of the game in slot w, and over[w] is True once it
+    has ended (or if the slot is idle, at the end of a run). The outcome of
+    every game is kept in the arrays game_over, winner, lengths (in rounds),
+    capped and stalemate, of shape (n_games,).
+        
+    color_counts[p, w, c] is the number of spaces of group c that player p
+    owns in slot w, where the groups are the 8 colors of Property.COLORS 
+    followed by RAILROAD, UTILITY and OTHER. It is updated on every change of
+    ownership, so monopoly checks never scan the board. Likewise 
+    mortgage_counts[p, w] is the number of mortgaged spaces p owns.
+    
+    The Chance and Community Chest decks of each game are the card indexes
+    in deck_order, read at deck_cursor and reshuffled when it wraps around;
+    deck_holder is the seat holding the deck's get out of jail free card, 
+    or -1. Card effects are looked up in the card_action and card_value 
+    tables.
+    
+    Games still running after max_rounds rounds are stopped and flagged in
+    'capped', and games in a stalemate are stopped and flagged in 
+    'stalemate', as in monopoly.Game: version counts the changes of 
+    ownership or houses other than random trades, and window_version and 
+    window_shares hold it and the players' shares of net worth at the start
+    of the current window of stalemate_rounds rounds. The winner of a 
+    stopped game is the player with the highest net worth, or -1 (a draw) 
+    if end_rule='draw'.
+    '''
+    # Default limit on the number of slots: wider arrays stop paying off 
+    # once the per-operation overhead is amortized
+    MAX_WIDTH = 8192
+    # Once every game has started, the last ones running (at most this many,
+    # and an eighth of the width) are finished one by one by monopoly.Game:
+    # a round of array operations costs milliseconds however few games are
+    # left, a round of one game tens of microseconds
+    SCALAR_TAIL = 256
+
+    def __init__(self,
+                 n_games,
+                 cash_thresholds=(200, 200, 200, 200),
+                 board=None,
+                 seed=None,
+                 max_rounds=1000,
+                 stalemate_rounds=100,
+                 stalemate_tolerance=0.05,
+                 end_rule='net_worth',
+                 width=None):
+        if board is None:
+            board = monopoly.build_board()
+        self.n_games = n_games
+        self.width = max(1, min(n_games, width or self.MAX_WIDTH))
+        self.cash_thresholds = np.asarray(cash_thresholds, dtype=np.int64)
+        self.n_players = len(cash_thresholds)
+        self.seed = seed
+        if end_rule not in ('net_worth', 'draw'):
+            raise ValueError(f'Unknown end_rule: {end_rule}')
+        self.max_rounds = max_rounds
+        self.stalemate_rounds = stalemate_rounds
+        self.stalemate_tolerance = stalemate_tolerance
+        self.end_rule = end_rule
+        self.rng = np.random.default_rng(seed)
+        self.board = board
+        self._load_board(board)
+        self.reset()
+
+    def __repr__(self):
+        return (f'BatchGame(n_games={self.n_games},'+
+                f'width={self.width},'+
+                f'cash_thresholds={self.cash_thresholds.tolist()},'+
+                f'seed={self.seed})')
+
+    def _load_board(self, board):
+        '''
+        Copies the static board data into flat lookup arrays.
+        '''
+        n = PAD + 1
+        self.price = np.zeros(n, dtype=np.int64)
+        self.rent_table = np.zeros((n, 6), dtype=np.int64)
+        self.house_price = np.zeros(n, dtype=np.int64)
+        self.color = np.zeros(n, dtype=np.int64)
+        self.is_property = np.zeros(n, dtype=bool)
+        self.is_railroad = np.zeros(n, dtype=bool)
+        self.is_utility = np.zeros(n, dtype=bool)
+        self.is_luxury_tax = np.zeros(n, dtype=bool)
+        self.is_income_tax = np.zeros(n, dtype=bool)
+        self.is_go_to_jail = np.zeros(n, dtype=bool)
+        self.is_chance = np.zeros(n, dtype=bool)
+        self.is_community_chest = np.zeros(n, dtype=bool)
+
+        n_colors = len(monopoly.Property.COLORS)
+        self.RAILROAD, self.UTILITY, self.OTHER = n_colors, n_colors+1, n_colors+2
+        self.color[:] = self.OTHER
+        for i in range(40):
+            space = board[i]
+            if isinstance(space, monopoly.Property):
+                self.is_property[i] = True
+                self.price[i] = space.price
+                self.rent_table[i] = [space.rent_data[h] for h in range(6)]
+                self.house_price[i] = space.house_price
+                self.color[i] = monopoly.Property.COLORS.index(space.color)
+            elif isinstance(space, monopoly.Railroad):
+                self.is_railroad[i] = True
+                self.price[i] = space.price
+                self.color[i] = self.RAILROAD
+            elif isinstance(space, monopoly.Utility):
+                self.is_utility[i] = True
+                self.price[i] = space.price
+                self.color[i] = self.UTILITY
+            elif space.kind == 'luxury_tax':
+                self.is_luxury_tax[i] = True
+            elif space.kind == 'income_tax':
+                self.is_income_tax[i] = True
+            elif space.kind == 'go_to_jail':
+                self.is_go_to_jail[i] = True
+            elif space.kind == 'chance':
+                self.is_chance[i] = True
+            elif space.kind == 'community_chest':
+                self.is_community_chest[i] = True
+
+        self.is_ownable = self.is_property | self.is_railroad | self.is_utility
+        self.nearest = {RAILROAD: np.array(board.nearest('railroad')),
+                        UTILITY: np.array(board.nearest('utility'))}
+        
+        # Card tables, one row per deck. For repairs, card_value is the cost
+        # per house and card_value2 the cost per hotel.
+        decks = (monopoly.ChanceDeck.CARDS, monopoly.CommunityChest.CARDS)
+        self.deck_size = np.array([len(cards) for cards in decks])
+        size = self.deck_size.max()
+        self.card_action = np.full((2, size), COLLECT, dtype=np.int64)
+        self.card_value = np.zeros((2, size), dtype=np.int64)
+        self.card_value2 = np.zeros((2, size), dtype=np.int64)
+        for d, cards in enumerate(decks):
+            for c, (text, action, value) in enumerate(cards):
+                self.card_action[d, c] = CARD_ACTIONS.index(action)
+                if action == 'repairs':
+                    self.card_value[d, c], self.card_value2[d, c] = value
+                elif value is not None:
+                    self.card_value[d, c] = value
+        self.ownable_spaces = np.flatnonzero(self.is_ownable)
+        # Deck drawn from on each space, or -1
+        self.space_deck = np.full(n, -1, dtype=np.int64)
+        self.space_deck[self.is_chance] = CHANCE
+        self.space_deck[self.is_community_chest] = COMMUNITY_CHEST
+
+        self.groups = np.full((n_colors, 3), PAD, dtype=np.int64)
+        self.group_sizes = np.zeros(n_colors, dtype=np.int64)
+        for c in range(n_colors):
+            members = np.flatnonzero(self.color == c)
+            self.groups[c, :len(members)] = members
+            self.group_sizes[c] = len(members)
+        # House building: one table for the states of all color groups, 
+        # those of group c numbered from build_offsets[c], and the weights 
+        # that number the states of each group's houses and mortgages (0 for
+        # the PAD member)
+        tables = {size: _build_table(size) 
+                  for size in set(self.group_sizes.tolist())}
+        adds, lengths = [], []
+        self.build_offsets = np.zeros(n_colors, dtype=np.int64)
+        self.house_weights = np.zeros((n_colors, 3), dtype=np.int64)
+        self.mortgage_weights = np.zeros((n_colors, 3), dtype=np.int64)
+        for c, size in enumerate(self.group_sizes):
+            add, length = tables[size]
+            self.build_offsets[c] = sum(len(x) for x in lengths)
+            # k never exceeds length, so the padding is never read
+            adds.append(np.pad(add, ((0, 0), (0, 5*(3 - size)), (0, 3 - size))))
+            lengths.append(length)
+            self.house_weights[c, :size] = 6**np.arange(size)
+            self.mortgage_weights[c, :size] = 6**size * 2**np.arange(size)
+        self.build_adds = np.concatenate(adds)
+        self.build_lengths = np.concatenate(lengths)
+        self.group_house_price = self.house_price[self.groups[:, 0]]
+
+        # Same arithmetic as Player.mortgage / Player.un_mortgage
+        self.mortgage_value = np.array([round(0.5*p) for p in self.price])
+        self.un_mortgage_need = 1.1 * 0.5 * self.price
+        self.un_mortgage_cost = np.array([round(x) for x in self.un_mortgage_need])
+        self.sell_value = np.array([round(0.5*p) for p in self.house_price])
+        
+        # Player.cover_debt raises cash in a fixed order: mortgage railroads
+        # and utilities, then sell one house per property, then mortgage 
+        # properties. Lay those candidate actions out as columns.
+        others = self.ownable_spaces[~self.is_property[self.ownable_spaces]]
+        props = np.flatnonzero(self.is_property)
+        self.liquidation_spaces = np.concatenate([others, props, props])
+        self.liquidation_sells_house = np.concatenate([
+            np.zeros(len(others), dtype=bool),
+            np.ones(len(props), dtype=bool),
+            np.zeros(len(props), dtype=bool)])
+        self.liquidation_value = np.concatenate([
+            0.5*self.price[others], 0.5*self.house_price[props], 0.5*self.price[props]])
+        self.liquidation_cash = np.concatenate([
+            self.mortgage_value[others], self.sell_value[props], self.mortgage_value[props]])
+
+    def reset(self):
+        '''
+        Clears the outcomes and starts games 0, ..., width-1 in the slots.
+        '''
+        W, P, G = self.width, self.n_players, self.n_games
+        self.cash = np.empty((P, W), dtype=np.int64)
+        self.space = np.empty((P, W), dtype=np.int8)
+        self.bankrupt = np.empty((P, W), dtype=bool)
+        self.in_jail = np.empty((P, W), dtype=bool)
+        self.turns_in_jail = np.empty((P, W), dtype=np.int8)
+        self.owner = np.empty((W, PAD + 1), dtype=np.int8)
+        self.houses = np.empty((W, PAD + 1), dtype=np.int8)
+        self.mortgaged = np.empty((W, PAD + 1), dtype=bool)
+        self.mortgage_counts = np.empty((P, W), dtype=np.int64)
+        self.color_counts = np.empty((P, W, self.OTHER + 1), dtype=np.int8)
+        self.deck_order = np.tile(np.arange(self.card_action.shape[1], dtype=np.int8), 
+                                  (W, 2, 1))
+        self.deck_cursor = np.empty((W, 2), dtype=np.int8)
+        self.deck_holder = np.empty((W, 2), dtype=np.int8)
+        self.bank_houses = np.empty(W, dtype=np.int64)
+        self.rounds = np.empty(W, dtype=np.int64)
+        self.rounds_no_monopolies = np.empty(W, dtype=np.int64)
+        self.version = np.empty(W, dtype=np.int64)
+        self.owner_changes = np.empty(W, dtype=np.int64)
+        self.no_trades = np.empty((P, W), dtype=np.int64)
+        self.window_version = np.empty(W, dtype=np.int64)
+        self.window_shares = np.empty((W, P))
+        self.game = np.empty(W, dtype=np.int64)
+        self.over = np.empty(W, dtype=bool)
+        self.game_over = np.zeros(G, dtype=bool)
+        self.winner = np.full(G, -1, dtype=np.int64)
+        self.lengths = np.zeros(G, dtype=np.int64)
+        self.capped = np.zeros(G, dtype=bool)
+        self.stalemate = np.zeros(G, dtype=bool)
+        self._start(np.arange(W), np.arange(W))
+
+    def _start(self, rows, games):
+        '''
+        Starts game games[i] in slot rows[i], from the beginning-of-game 
+        state. The decks are shuffled at their first draw.
+        '''
+        self.cash[:, rows] = 1500
+        self.space[:, rows] = 0
+        self.bankrupt[:, rows] = False
+        self.in_jail[:, rows] = False
+        self.turns_in_jail[:, rows] = 0
+        self.owner[rows] = NO_OWNER
+        self.owner[rows, PAD] = PAD_OWNER
+        self.houses[rows] = 0
+        self.mortgaged[rows] = False
+        self.mortgage_counts[:, rows] = 0
+        self.color_counts[:, rows] = 0
+        self.deck_cursor[rows] = self.deck_size
+        self.deck_holder[rows] = -1
+        self.bank_houses[rows] = 44
+        self.rounds[rows] = 0
+        self.rounds_no_monopolies[rows] = 0
+        self.version[rows] = 0
+        self.owner_changes[rows] = 0
+        self.no_trades[:, rows] = -1
+        self.window_version[rows] = -1
+        self.window_shares[rows] = 0.0
+        self.game[rows] = games
+        self.over[rows] = False
+
+    def _finish(self, rows, winners):
+        '''
+        Records the outcome of the games ending in the given slots.
+        '''
+        games = self.game[rows]
+        self.over[rows] = True
+        self.game_over[games] = True
+        self.winner[games] = winners
+        self.lengths[games] = self.rounds[rows]
+
+    #%% Vectorized helpers. 'rows' is always an array of distinct slots
+
+    def _roll(self, n):
+        dice = self.rng.integers(1, 7, size=(n, 2))
+        return dice[:, 0], dice[:, 1]
+
+    def _set_owner(self, rows, spaces, owners):
+        '''
+        Sets the owner of space spaces[i] in game rows[i] to owners[i], keeping
+        color_counts and mortgage_counts up to date.
+        '''
+        colors = self.color[spaces]
+        mortgaged = self.mortgaged[rows, spaces]
+        old = self.owner[rows, spaces]
+        had = old >= 0
+        np.add.at(self.color_counts, (old[had], rows[had], colors[had]), -1)
+        had &= mortgaged
+        np.add.at(self.mortgage_counts, (old[had], rows[had]), -1)
+        has = owners >= 0
+        np.add.at(self.color_counts, (owners[has], rows[has], colors[has]), 1)
+        has &= mortgaged
+        np.add.at(self.mortgage_counts, (owners[has], rows[has]), 1)
+        self.owner[rows, spaces] = owners
+        self.owner_changes[rows] += 1
+        
+    def _monopolies(self, rows):
+        '''
+        Returns a (P, len(rows), 8) boolean array of monopolies.
+        '''
+        return self.color_counts[:, rows, :len(self.group_sizes)] >= self.group_sizes
+
+    def _move(self, rows, p, spaces):
+        old = self.space[p][rows]
+        new = (old + spaces) % 40
+        passed = (spaces > 0) & (new < old)
+        self.cash[p][rows[passed]] += 200
+        self.space[p][rows] = new
+
+    def _go_to_jail(self, rows, p):
+        self.space[p][rows] = 10
+        self.in_jail[p][rows] = True
+
+    def _rent(self, rows, spaces, owners, card):
+        '''
+        Returns the rent owed on the given spaces, as in Player.pay_rent. 
+        card[i] is the multiplier of the card that sent the player to a 
+        railroad or utility (see Player.draw_card), or 0.
+        '''
+        rent = np.zeros(len(rows), dtype=np.int64)
+
+        prop = self.is_property[spaces]
+        if prop.any():
+            r, s, o = rows[prop], spaces[prop], owners[prop]
+            houses = self.houses[r, s]
+            base = self.rent_table[s, houses]
+            color = self.color[s]
+            monopoly_ = self.color_counts[o, r, color] >= self.group_sizes[color]
+            rent[prop] = np.where(monopoly_ & (houses == 0), 2*base, base)
+
+        rail = self.is_railroad[spaces]
+        if rail.any():
+            r, o = rows[rail], owners[rail]
+            rent[rail] = (self.color_counts[o, r, self.RAILROAD] * 
+                          (50 * np.maximum(card[rail], 1)))
+
+        util = self.is_utility[spaces]
+        if util.any():
+            r, o, c = rows[util], owners[util], card[util]
+            count = self.color_counts[o, r, self.UTILITY]
+            dice1, dice2 = self._roll(len(r))
+            rent[util] = np.where(c > 0, c, np.where(count == 1, 4, 10)) * (dice1 + dice2)
+
+        rent[self.mortgaged[rows, spaces]] = 0
+        return rent
+
+    def _pay_rent(self, rows, p, spaces, owners, card):
+        rent = self._rent(rows, spaces, owners, card)
+        short = self.cash[p][rows] - rent < 0
+        if short.any():
+            r = rows[short]
+            self._cover_debt(r, p, rent[short] - self.cash[p][r], owners[short])
+        paying = ~self.bankrupt[p][rows]
+        r, o, rent = rows[paying], owners[paying], rent[paying]
+        self.cash[p][r] -= rent
+        self.cash[o, r] += rent
+
+    @staticmethod
+    def _per_row(rows, amounts):
+        # np.full is much cheaper than np.broadcast_to for these small arrays
+        if np.ndim(amounts) == 0:
+            return np.full(len(rows), amounts, dtype=np.int64)
+        return amounts
+
+    def _pay_player(self, rows, p, payee, amounts):
+        '''
+        Seat p pays 'amounts' to seat 'payee', as in Player.pay_player.
+        '''
+        amounts = self._per_row(rows, amounts)
+        short = self.cash[p][rows] - amounts < 0
+        if short.any():
+            r = rows[short]
+            self._cover_debt(r, p, amounts[short] - self.cash[p][r],
+                             np.full(len(r), payee))
+        paying = ~self.bankrupt[p][rows]
+        r = rows[paying]
+        self.cash[p][r] -= amounts[paying]
+        self.cash[payee][r] += amounts[paying]
+
+    def _pay_bank(self, rows, p, amounts):
+        amounts = self._per_row(rows, amounts)
+        short = self.cash[p][rows] - amounts < 0
+        if short.any():
+            self._cover_debt(rows[short], p, amounts[short],
+                             np.full(short.sum(), NO_OWNER))
+        paying = ~self.bankrupt[p][rows]
+        self.cash[p][rows[paying]] -= amounts[paying]
+
+    def _resolve_space(self, rows, p):
+        '''
+        Vectorized Player.resolve_space for seat p in the given games. The
+        spaces that cards move p to are resolved in further passes, one per
+        card, instead of recursively, so that every pass works on all the 
+        games at once.
+        '''
+        card = np.zeros(len(rows), dtype=np.int64)
+        while rows.size:
+            spaces = self.space[p][rows]
+            owners = self.owner[rows, spaces]
+            ownable = self.is_ownable[spaces]
+
+            buy = (ownable & (owners == NO_OWNER) &
+                   (self.cash[p][rows] - self.price[spaces] > self.cash_thresholds[p]))
+            if buy.any():
+                r, s = rows[buy], spaces[buy]
+                self.cash[p][r] -= self.price[s]
+                self.owner[r, s] = p
+                self.color_counts[p][r, self.color[s]] += 1
+                # A space the bank got back from a bankrupt player may still
+                # be mortgaged
+                self.mortgage_counts[p][r] += self.mortgaged[r, s]
+                self.version[r] += 1
+                self.owner_changes[r] += 1
+
+            rent = ownable & (owners >= 0) & (owners != p)
+            if rent.any():
+                self._pay_rent(rows[rent], p, spaces[rent], owners[rent], 
+                               card[rent])
+
+            luxury = self.is_luxury_tax[spaces]
+            tax = luxury | self.is_income_tax[spaces]
+            if tax.any():
+                r = rows[tax]
+                cash = self.cash[p][r]
+                self._pay_bank(r, p, np.where(
+                    luxury[tax], 75, 
+                    np.where(cash >= 2000, 200, np.round(0.1*cash))).astype(np.int64))
+
+            jail = self.is_go_to_jail[spaces]
+            if jail.any():
+                self._go_to_jail(rows[jail], p)
+
+            decks = self.space_deck[spaces]
+            draw = decks >= 0
+            if not draw.any():
+                break
+            rows, card = self._draw_card(rows[draw], p, decks[draw])
+
+    def _draw(self, rows, decks):
+        '''
+        Returns the next card of deck decks[i] in each game, reshuffling 
+        decks that were drawn through and skipping a get out of jail free 
+        card that a player holds, as in monopoly.Deck.draw.
+        '''
+        cards = np.empty(len(rows), dtype=np.int64)
+        pending = np.arange(len(rows))
+        while pending.size:
+            r, d = rows[pending], decks[pending]
+            cursor = self.deck_cursor[r, d]
+            wrap = cursor == self.deck_size[d]
+            if wrap.any():
+                for deck in np.unique(d[wrap]):
+                    w = r[wrap & (d == deck)]
+                    size = self.deck_size[deck]
+                    self.deck_order[w, deck, :size] = np.argsort(
+                        self.rng.random((len(w), size)), axis=1)
+                cursor[wrap] = 0
+            card = self.deck_order[r, d, cursor]
+            self.deck_cursor[r, d] = cursor + 1
+            cards[pending] = card
+            held = ((self.card_action[d, card] == JAIL_FREE) &
+                    (self.deck_holder[r, d] >= 0))
+            pending = pending[held]
+        return cards
+
+    def _draw_card(self, rows, p, decks):
+        '''
+        Vectorized Player.draw_card for seat p in the given games, drawing
+        from deck decks[i] in game rows[i]. The cards that move p are only 
+        carried out up to the move: returns the games whose space is left 
+        to resolve, and the rent multiplier of the card in each (0 if the 
+        space is resolved as usual).
+        '''
+        cards = self._draw(rows, decks)
+        action = self.card_action[decks, cards]
+        value = self.card_value[decks, cards]
+        space = self.space[p][rows]
+
+        # ADVANCE, RAILROAD, UTILITY and BACK move p, forward to a space or
+        # back a number of spaces
+        moving = action <= BACK
+        steps = (value - space) % 40
+        for kind in (RAILROAD, UTILITY):
+            m = action == kind
+            steps[m] = (self.nearest[kind][space[m]] - space[m]) % 40
+        m = action == BACK
+        steps[m] = -value[m]
+        moved = rows[moving]
+        self._move(moved, p, steps[moving])
+        card = np.where((action == RAILROAD) | (action == UTILITY), value, 0)
+
+        m = action == JAIL
+        if m.any():
+            self._go_to_jail(rows[m], p)
+
+        m = action == COLLECT
+        if m.any():
+            self.cash[p][rows[m]] += value[m]
+
+        m = action == JAIL_FREE
+        if m.any():
+            self.deck_holder[rows[m], decks[m]] = p
+
+        # Payments to the bank: fixed amounts, and repairs at so much per 
+        # house and per hotel
+        pay = (action == PAY) | (action == REPAIRS)
+        repairs = action == REPAIRS
+        if repairs.any():
+            r = rows[repairs]
+            houses = np.where(self.owner[r, :PAD] == p, self.houses[r, :PAD], 0)
+            hotels = (houses == 5).sum(axis=1)
+            houses = np.where(houses < 5, houses, 0).sum(axis=1)
+            value[repairs] = (value[repairs] * houses + 
+                              self.card_value2[decks[repairs], cards[repairs]] * hotels)
+            pay &= value > 0
+        if pay.any():
+            self._pay_bank(rows[pay], p, value[pay])
+
+        m = action == PAY_EACH
+        if m.any():
+            r, amount = rows[m], value[m]
+            for q in range(self.n_players):
+                if q == p:
+                    continue
+                k = ~self.bankrupt[q][r] & ~self.bankrupt[p][r]
+                if k.any():
+                    self._pay_player(r[k], p, q, amount[k])
+
+        m = action == COLLECT_EACH
+        if m.any():
+            r, amount = rows[m], value[m]
+            for q in range(self.n_players):
+                if q == p:
+                    continue
+                k = ~self.bankrupt[q][r]
+                if k.any():
+                    self._pay_player(r[k], q, p, amount[k])
+
+        return moved, card[moving]
+
+    @staticmethod
+    def _ranks(rows):
+        '''
+        Returns the position of each entry of the sorted array 'rows' among 
+        the entries equal to it.
+        '''
+        first = np.r_[True, rows[1:] != rows[:-1]]
+        starts = np.flatnonzero(first)
+        return np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+
+    def _develop(self, rows, p):
+        '''
+        Vectorized end-of-turn un-mortgaging and house building, as in 
+        Strategy.un_mortgage and Strategy.build. Only the mortgaged spaces, 
+        and the monopolies where seat p can afford a house, are looked at;
+        the houses bought on each monopoly are read from the building table.
+        Each game's mortgages and monopolies are handled in board order, the 
+        k-th of every game at once.
+        '''
+        threshold = self.cash_thresholds[p]
+        rows = rows[self.cash[p][rows] > threshold]
+        if not rows.size:
+            return
+
+        r = rows[self.mortgage_counts[p][rows] > 0]
+        if r.size:
+            i, spaces = np.nonzero((self.owner[r] == p) & self.mortgaged[r])
+            r = r[i]
+            ranks = self._ranks(i)
+            for k in range(ranks.max() + 1):
+                m = ranks == k
+                rk, sk = r[m], spaces[m]
+                ok = self.cash[p][rk] - self.un_mortgage_need[sk] >= threshold
+                rk, sk = rk[ok], sk[ok]
+                self.mortgaged[rk, sk] = False
+                self.cash[p][rk] -= self.un_mortgage_cost[sk]
+                self.mortgage_counts[p][rk] -= 1
+
+        n_colors = len(self.group_sizes)
+        i, colors = np.nonzero(self.color_counts[p][rows, :n_colors] >= self.group_sizes)
+        r = rows[i]
+        # Cash only goes down, so monopolies whose houses p can't afford now
+        # are out of reach for this turn
+        affordable = self.cash[p][r] - threshold >= self.group_house_price[colors]
+        i, r, colors = i[affordable], r[affordable], colors[affordable]
+        if not r.size:
+            return
+        spaces = r[:, None], self.groups[colors]
+        houses = self.houses[spaces]
+        state = (self.build_offsets[colors] + 
+                 (houses * self.house_weights[colors]).sum(axis=1) +
+                 (self.mortgaged[spaces] * self.mortgage_weights[colors]).sum(axis=1))
+        lengths = self.build_lengths[state]
+        # Monopolies in color order, each spending what the ones before 
+        # left, as in Strategy.plan_build, which stops at the first house the
+        # bank can't supply
+        ranks = self._ranks(i)
+        k = np.zeros_like(lengths)
+        for rank in range(ranks.max() + 1):
+            m = np.flatnonzero(ranks == rank)
+            rk = r[m]
+            price = self.group_house_price[colors[m]]
+            cash, bank = self.cash[p][rk], self.bank_houses[rk]
+            k[m] = np.maximum(np.minimum((cash - threshold) // price,
+                                         np.minimum(bank, lengths[m])), 0)
+            self.cash[p][rk] = cash - k[m] * price
+            self.bank_houses[rk] = bank - k[m]
+        self.houses[spaces] = houses + self.build_adds[state, k]
+        self.version[r[k > 0]] += 1
+
+    def _cover_debt(self, rows, p, debts, creditors):
+        '''
+        Vectorized Player.cover_debt. Every action cover_debt might take is a
+        column of the liquidation table; an action is taken if the cash raised
+        by the actions before it has not yet exceeded the debt.
+        '''
+        spaces = self.liquidation_spaces
+        sells_house = self.liquidation_sells_house
+        owned = self.owner[rows][:, spaces] == p
+        possible = owned & np.where(sells_house,
+                                    self.houses[rows][:, spaces] > 0,
+                                    ~self.mortgaged[rows][:, spaces])
+        value = np.where(possible, self.liquidation_value, 0.0)
+        raised = np.cumsum(value, axis=1)
+        taken = possible & (raised - value <= debts[:, None])
+
+        self.cash[p][rows] += (taken * self.liquidation_cash).sum(axis=1)
+        mortgages = taken & ~sells_house
+        r, c = np.nonzero(mortgages)
+        self.mortgaged[rows[r], spaces[c]] = True
+        self.mortgage_counts[p][rows] += mortgages.sum(axis=1)
+        sales = (taken & sells_house).sum(axis=1)
+        r, c = np.nonzero(taken & sells_house)
+        self.houses[rows[r], spaces[c]] -= 1
+        self.bank_houses[rows] += sales
+        self.version[rows[sales > 0]] += 1
+
+        broke = raised[:, -1] <= debts
+        if broke.any():
+            self._declare_bankruptcy(rows[broke], p, creditors[broke])
+
+    def _declare_bankruptcy(self, rows, p, creditors):
+        '''
+        Vectorized Player.declare_bankruptcy. creditors[i] is NO_OWNER for a
+        debt to the bank.
+        '''
+        self.bankrupt[p][rows] = True
+        holder = self.deck_holder[rows]
+        self.deck_holder[rows] = np.where(holder == p, -1, holder)
+        # Everything p owns changes hands, so the counters move in one go
+        owner = self.owner[rows]
+        self.owner[rows] = np.where(owner == p, creditors[:, None], owner)
+        paid = creditors >= 0
+        r, creditors = rows[paid], creditors[paid]
+        self.color_counts[creditors, r] += self.color_counts[p][r]
+        self.mortgage_counts[creditors, r] += self.mortgage_counts[p][r]
+        self.color_counts[p][rows] = 0
+        self.mortgage_counts[p][rows] = 0
+        self.version[rows] += 1
+        self.owner_changes[rows] += 1
+        self.cash[creditors, r] += self.cash[p][r]
+
+    #%% Trades
+
+    def _owned_member(self, rows, colors, owners):
+        '''
+        Returns the first space of color group colors[i] owned by owners[i] 
+        in game rows[i].
+        '''
+        members = self.groups[colors]
+        first = np.argmax(self.owner[rows[:, None], members] == owners[:, None],
+                          axis=1)
+        return members[np.arange(len(rows)), first]
+
+    def random_trades(self, rows):
+        '''
+        Game.random_trade in each of the given games: two random active 
+        players swap a random property each, if both own one.
+        '''
+        # The two active players with the smallest random keys are a random 
+        # pair, and the owned space with the largest key a random property
+        keys = np.where(self.bankrupt[:, rows].T, 2.0, 
+                        self.rng.random((len(rows), self.n_players)))
+        pairs = np.argsort(keys, axis=1)
+        p1, p2 = pairs[:, 0], pairs[:, 1]
+        owner = self.owner[rows, :PAD]
+        keys = self.rng.random(owner.shape)
+        owned1, owned2 = owner == p1[:, None], owner == p2[:, None]
+        prop1 = np.argmax(np.where(owned1, keys, -1.0), axis=1)
+        prop2 = np.argmax(np.where(owned2, keys, -1.0), axis=1)
+        swap = owned1.any(axis=1) & owned2.any(axis=1)
+        if swap.any():
+            r = rows[swap]
+            self._set_owner(np.concatenate([r, r]),
+                            np.concatenate([prop1[swap], prop2[swap]]),
+                            np.concatenate([p2[swap], p1[swap]]))
+
+    def find_trades(self, rows, buyer):
+        '''
+        Vectorized Game.find_trades with the default Strategy.propose_trade
+        and accept_trade: in each game, the first seller in seat order with 
+        whom buyer can swap properties that complete an "almost monopoly" of
+        each, of different colors, trades with buyer. As in 
+        Game.find_trades, the games where buyer's last search found nothing 
+        and no space has changed hands since are skipped.
+        '''
+        n_colors = len(self.group_sizes)
+        almost = self.group_sizes - 1
+        owner_changes = self.owner_changes[rows]
+        searched = self.no_trades[buyer][rows] != owner_changes
+        rows, owner_changes = rows[searched], owner_changes[searched]
+        # Searches that find nothing are recorded now; the games where a 
+        # trade is made have changed hands by then
+        self.no_trades[buyer][rows] = owner_changes
+        rows = rows[(self.color_counts[buyer][rows, :n_colors] == almost).any(axis=1)]
+        colors = np.arange(n_colors)
+        for seller in range(self.n_players):
+            if seller == buyer or not rows.size:
+                continue
+            buyer_counts = self.color_counts[buyer][rows, :n_colors]
+            seller_counts = self.color_counts[seller][rows, :n_colors]
+            buy = (buyer_counts == almost) & (seller_counts > 0)
+            sell = (seller_counts == almost) & (buyer_counts > 0)
+            # Strategy.propose_trade takes the first color buyer wants and the
+            # first other color seller wants, or, if seller only wants that
+            # first color, the next color buyer wants
+            first_buy = np.argmax(buy, axis=1)
+            first_sell = np.argmax(sell, axis=1)
+            other_sell = sell & (colors != first_buy[:, None])
+            other_buy = buy & (colors != first_sell[:, None])
+            first = buy.any(axis=1) & other_sell.any(axis=1)
+            second = ~first & sell.any(axis=1) & other_buy.any(axis=1)
+            trade = first | second
+            if not trade.any():
+                continue
+            r = rows[trade]
+            buy_color = np.where(first, first_buy, np.argmax(other_buy, axis=1))[trade]
+            sell_color = np.where(first, np.argmax(other_sell, axis=1), first_sell)[trade]
+            n = len(r)
+            b = self._owned_member(r, buy_color, np.full(n, seller))
+            s = self._owned_member(r, sell_color, np.full(n, buyer))
+            self._set_owner(np.concatenate([r, r]), np.concatenate([b, s]),
+                            np.repeat([buyer, seller], n))
+            self.version[r] += 1
+            rows = rows[~trade]
+
+    #%% Turns and rounds
+
+    def take_turn(self, rows, p):
+        '''
+        Vectorized Player.take_turn for seat p in the given games.
+        '''
+        jailed = self.in_jail[p][rows]
+        if jailed.any():
+            # Use a get out of jail free card, Chance first as in 
+            # Player.jail_card, then take a normal turn
+            held = self.deck_holder[rows] == p
+            use = jailed & held.any(axis=1)
+            if use.any():
+                r = rows[use]
+                self.deck_holder[r, np.argmax(held[use], axis=1)] = -1
+                self.in_jail[p][r] = False
+                self.turns_in_jail[p][r] = 0
+                jailed = self.in_jail[p][rows]
+
+        # Games where p leaves jail move along with the first roll of the 
+        # others, but don't roll again
+        leaving = rows[:0]
+        jail = rows[jailed]
+        if jail.size:
+            self.turns_in_jail[p][jail] += 1
+            dice1, dice2 = self._roll(len(jail))
+            double = dice1 == dice2
+            third = self.turns_in_jail[p][jail] == 3
+            bail = ~double & third
+            if bail.any():
+                self._pay_bank(jail[bail], p, 50)
+            leave = double | third
+            leaving, leaving_roll = jail[leave], (dice1 + dice2)[leave]
+            self.in_jail[p][leaving] = False
+            self.turns_in_jail[p][leaving] = 0
+
+        rolling = rows[~jailed]
+        for n_doubles in range(3):
+            if not rolling.size and not leaving.size:
+                break
+            dice1, dice2 = self._roll(len(rolling))
+            double = dice1 == dice2
+            if n_doubles == 2:
+                # Third double in a row: straight to jail, without moving
+                self._go_to_jail(rolling[double], p)
+                keep = ~double
+                rolling, double = rolling[keep], double[keep]
+                dice1, dice2 = dice1[keep], dice2[keep]
+            moving, steps = rolling, dice1 + dice2
+            if leaving.size:
+                moving = np.concatenate([rolling, leaving])
+                steps = np.concatenate([steps, leaving_roll])
+                leaving = leaving[:0]
+            self._move(moving, p, steps)
+            self._resolve_space(moving, p)
+            rolling = rolling[double]
+            rolling = rolling[~self.in_jail[p][rolling] & ~self.bankrupt[p][rolling]]
+
+        self._develop(rows, p)
+
+    def net_worth(self, rows):
+        '''
+        Returns the (len(rows), P) net worth of each player, as in 
+        monopoly.Player.net_worth. Bankrupt players are worth nothing.
+        '''
+        owner = self.owner[rows, :PAD]
+        value = np.where(self.mortgaged[rows, :PAD], self.price[:PAD] // 2,
+                         self.price[:PAD])
+        value = value + self.houses[rows, :PAD] * self.house_price[:PAD]
+        worth = self.cash[:, rows].T.copy()
+        for p in range(self.n_players):
+            worth[:, p] += np.where(owner == p, value, 0).sum(axis=1)
+        worth[self.bankrupt[:, rows].T] = 0
+        return worth
+
+    def _stop(self, rows, flags):
+        '''
+        Ends the games in the given slots at the round limit or in a 
+        stalemate, setting 'flags' (capped or stalemate) for them.
+        '''
+        flags[self.game[rows]] = True
+        if self.end_rule == 'draw':
+            self._finish(rows, -1)
+        else:
+            self._finish(rows, np.argmax(self.net_worth(rows), axis=1))
+
+    def _stalemates(self, rows):
+        '''
+        Called at the end of every 'stalemate_rounds' window, as 
+        Game._stalemate. Returns a boolean array: True for the games in 
+        which nothing but random trades changed ownership or houses during
+        the window, and the players' shares of net worth stayed put.
+        '''
+        worth = self.net_worth(rows)
+        total = worth.sum(axis=1, keepdims=True)
+        shares = np.divide(worth, total, out=np.zeros(worth.shape),
+                           where=total > 0)
+        version = self.version[rows]
+        stalemate = ((version == self.window_version[rows]) &
+                     (np.abs(shares - self.window_shares[rows]).max(axis=1)
+                      < self.stalemate_tolerance))
+        self.window_version[rows] = version
+        self.window_shares[rows] = shares
+        return stalemate
+
+    def _has_monopolies(self, rows):
+        return self._monopolies(rows).any(axis=(0, 2))
+
+    def play_round(self, rows):
+        '''
+        Plays one round in the given slots, as in Game.play_round.
+        '''
+        self.rounds[rows] += 1
+        for p in range(self.n_players):
+            rows = rows[~self.over[rows]]
+            turn = rows[~self.bankrupt[p][rows]]
+            if not turn.size:
+                continue
+            self.take_turn(turn, p)
+            self.find_trades(turn, p)
+            alive = (~self.bankrupt[:, turn]).sum(axis=0)
+            over = turn[alive == 1]
+            if over.size:
+                self._finish(over, np.argmax(~self.bankrupt[:, over], axis=0))
+
+    def play(self):
+        '''
+        Plays every game to completion, as in Game.play. Returns self.
+        '''
+        self.reset()
+        next_game = self.width
+        rows = np.arange(self.width)
+        while rows.size:
+            nm = self.rounds_no_monopolies[rows]
+            self.random_trades(rows[(nm % 10 == 0) & (nm > 0)])
+            r = self.rounds[rows]
+            self.random_trades(rows[(r > 0) & (r % 50 == 0)])
+
+            self.play_round(rows)
+            monopolies = self._has_monopolies(rows)
+            self.rounds_no_monopolies[rows] = np.where(
+                monopolies, 0, self.rounds_no_monopolies[rows] + 1)
+            rows = rows[~self.over[rows]]
+            if self.max_rounds is not None:
+                capped = rows[self.rounds[rows] >= self.max_rounds]
+                if capped.size:
+                    self._stop(capped, self.capped)
+                    rows = rows[~self.over[rows]]
+            if self.stalemate_rounds is not None:
+                check = rows[self.rounds[rows] % self.stalemate_rounds == 0]
+                if check.size:
+                    self._stop(check[self._stalemates(check)], self.stalemate)
+                    rows = rows[~self.over[rows]]
+
+            # Start the next games in the slots that were freed
+            if next_game < self.n_games:
+                if rows.size < self.width:
+                    free = np.flatnonzero(self.over)[:self.n_games - next_game]
+                    self._start(free, np.arange(next_game, next_game + free.size))
+                    next_game += free.size
+                    rows = np.flatnonzero(~self.over)
+            elif rows.size <= min(self.SCALAR_TAIL, self.width // 8):
+                self._play_out(rows)
+                break
+        return self
+
+    def _snapshot(self, w, dice):
+        '''
+        Returns the game in slot w, between two rounds, as a 
+        monopoly.GameSnapshot with the dice state 'dice'.
+        '''
+        P = self.n_players
+        window = self.window_version[w]
+        return monopoly.GameSnapshot(
+            tuple(self.owner[w, :PAD].tolist()),
+            tuple(self.houses[w, :PAD].tolist()),
+            tuple(self.mortgaged[w, :PAD].tolist()),
+            int(self.bank_houses[w]),
+            int(self.version[w]),
+            tuple((int(self.cash[p][w]), int(self.space[p][w]), 
+                   bool(self.bankrupt[p][w]), bool(self.in_jail[p][w]),
+                   int(self.turns_in_jail[p][w])) for p in range(P)),
+            (int(self.rounds[w]), int(self.rounds_no_monopolies[w]), False, 
+             None, None, 0, 
+             None if window < 0 else int(window),
+             None if window < 0 else self.window_shares[w].tolist()),
+            dice,
+            tuple((tuple(self.deck_order[w, d, :size].tolist()),
+                   int(self.deck_cursor[w, d]), int(self.deck_holder[w, d]))
+                  for d, size in enumerate(self.deck_size)))
+
+    def _play_out(self, rows):
+        '''
+        Finishes the games in the given slots with monopoly.Game, restored 
+        from their current state (see Game.restore) with fresh dice.
+        '''
+        board = self.board
+        board = monopoly.Board(board.spec) if board.spec else copy.deepcopy(board)
+        players = [monopoly.Player(name=f'player{p+1}', cash_threshold=int(t))
+                   for p, t in enumerate(self.cash_thresholds)]
+        game = monopoly.Game(board=board, players=players, 
+                             max_rounds=self.max_rounds,
+                             stalemate_rounds=self.stalemate_rounds,
+                             stalemate_tolerance=self.stalemate_tolerance,
+                             end_rule=self.end_rule)
+        game.reset(0)
+        dice = game.snapshot().dice
+        seeds = self.rng.integers(2**63, size=len(rows))
+        for w, seed in zip(rows.tolist(), seeds.tolist()):
+            game.restore(self._snapshot(w, dice), seed=seed)
+            game.play_out()
+            g = self.game[w]
+            winner = game.winner
+            self.winner[g] = -1 if winner is None else players.index(winner)
+            self.lengths[g] = game.rounds
+            self.capped[g] = game.outcome == 'max_rounds'
+            self.stalemate[g] = game.outcome == 'stalemate'
+            self.game_over[g] = True
+            self.over[w] = True
+
+    def results(self, names=None):
+        '''
+        Returns the outcome of the played games as monopoly.SimulationResults.
+        '''
+        if names is None:
+            names = [f'player{p+1}' for p in range(self.n_players)]
+        results = monopoly.SimulationResults(names, self.seed)
+        done = self.game_over
+        won = done & (self.winner >= 0)
+        results.wins = np.bincount(self.winner[won], minlength=self.n_players).tolist()
+        results.draws = int((done & (self.winner < 0)).sum())
+        n_capped = int(self.capped.sum())
+        n_stalemates = int(self.stalemate.sum())
+        results.outcomes['bankruptcy'] = int(done.sum()) - n_capped - n_stalemates
+        if n_capped:
+            results.outcomes['max_rounds'] = n_capped
+        if n_stalemates:
+            results.outcomes['stalemate'] = n_stalemates
+        lengths, counts = np.unique(self.lengths[done], return_counts=True)
+        results.game_lengths.update(dict(zip(lengths.tolist(), counts.tolist())))
+        return results
+
+def compare_with_reference(cash_thresholds=(50, 200, 200, 500),
+                           n_games=2000,
+                           seed=0,
+                           workers=1):
+    '''
+    Plays n_games with BatchGame and with the reference engine
+    (monopoly.simulate) for the same seating, and returns both results along
+    with the largest difference in win rate between them. The two engines
+    use different random streams, so only the distributions can agree.
+
+    Returns
+    -------
+    batch : monopoly.SimulationResults
+    reference : monopoly.SimulationResults
+    max_diff : float
+
+    '''
+    names = [f'player{p+1}' for p in range(len(cash_thresholds))]
+    players = [monopoly.Player(name=name, cash_threshold=t)
+               for name, t in zip(names, cash_thresholds)]
+    batch = BatchGame(n_games, cash_thresholds, seed=seed).play().results(names)
+    reference = monopoly.simulate(players, n_games, workers=workers, seed=seed)
+    max_diff = max(abs(batch.win_rates[n] - reference.win_rates[n]) for n in names)
+    return batch, reference, max_diff
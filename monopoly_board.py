@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Board definition compiled from property_data.xlsx by
+monopoly.compile_board(). Do not edit by hand; edit the
+spreadsheet and recompile instead.
+"""
+
+SOURCE_SHA256 = '01a1d112d72d67e3466989c04b4370a017782d5d9c4cf9db684d931a11d4ab5a'
+
+SPACES = (
+    {'kind': 'go', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'mediterranean_avenue', 'color': 'brown', 'price': 60, 'rent': (2, 10, 30, 90, 160, 250), 'house_price': 50},
+    {'kind': 'community_chest', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'baltic_avenue', 'color': 'brown', 'price': 60, 'rent': (4, 20, 60, 180, 320, 450), 'house_price': 50},
+    {'kind': 'income_tax', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'railroad', 'name': 'reading_railroad', 'color': None, 'price': 200, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'oriental_avenue', 'color': 'light_blue', 'price': 100, 'rent': (6, 30, 90, 270, 400, 550), 'house_price': 50},
+    {'kind': 'chance', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'vermont_avenue', 'color': 'light_blue', 'price': 100, 'rent': (6, 30, 90, 270, 400, 550), 'house_price': 50},
+    {'kind': 'property', 'name': 'connecticut_avenue', 'color': 'light_blue', 'price': 120, 'rent': (8, 40, 100, 300, 450, 600), 'house_price': 50},
+    {'kind': 'jail', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'st_charles_place', 'color': 'pink', 'price': 140, 'rent': (10, 50, 150, 450, 625, 750), 'house_price': 100},
+    {'kind': 'utility', 'name': 'electric_company', 'color': None, 'price': 150, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'states_avenue', 'color': 'pink', 'price': 140, 'rent': (10, 50, 150, 450, 625, 750), 'house_price': 100},
+    {'kind': 'property', 'name': 'virginia_avenue', 'color': 'pink', 'price': 160, 'rent': (12, 60, 180, 500, 700, 900), 'house_price': 100},
+    {'kind': 'railroad', 'name': 'pennsylvania_railroad', 'color': None, 'price': 200, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'st_james_place', 'color': 'orange', 'price': 180, 'rent': (14, 70, 200, 550, 750, 950), 'house_price': 100},
+    {'kind': 'community_chest', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'tennessee_avenue', 'color': 'orange', 'price': 180, 'rent': (14, 70, 200, 550, 750, 950), 'house_price': 100},
+    {'kind': 'property', 'name': 'new_york_avenue', 'color': 'orange', 'price': 200, 'rent': (16, 80, 220, 600, 800, 1000), 'house_price': 100},
+    {'kind': 'free_parking', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'kentucky_avenue', 'color': 'red', 'price': 220, 'rent': (18, 90, 250, 700, 875, 1050), 'house_price': 150},
+    {'kind': 'chance', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'indiana_avenue', 'color': 'red', 'price': 220, 'rent': (18, 90, 250, 700, 875, 1050), 'house_price': 150},
+    {'kind': 'property', 'name': 'illinois_avenue', 'color': 'red', 'price': 240, 'rent': (20, 100, 300, 750, 925, 1100), 'house_price': 150},
+    {'kind': 'railroad', 'name': 'bo_railroad', 'color': None, 'price': 200, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'atlantic_avenue', 'color': 'yellow', 'price': 260, 'rent': (22, 110, 330, 800, 975, 1150), 'house_price': 150},
+    {'kind': 'property', 'name': 'ventnor_avenue', 'color': 'yellow', 'price': 260, 'rent': (22, 110, 330, 800, 975, 1150), 'house_price': 150},
+    {'kind': 'utility', 'name': 'water_works', 'color': None, 'price': 150, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'marvin_gardens', 'color': 'yellow', 'price': 280, 'rent': (24, 120, 360, 850, 1025, 1200), 'house_price': 150},
+    {'kind': 'go_to_jail', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'pacific_avenue', 'color': 'green', 'price': 300, 'rent': (26, 130, 390, 900, 1100, 1275), 'house_price': 200},
+    {'kind': 'property', 'name': 'north_carolina_avenue', 'color': 'green', 'price': 300, 'rent': (26, 130, 390, 900, 1100, 1275), 'house_price': 200},
+    {'kind': 'community_chest', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'pennsylvania_avenue', 'color': 'green', 'price': 320, 'rent': (28, 150, 450, 1000, 1200, 1400), 'house_price': 200},
+    {'kind': 'railroad', 'name': 'short_line', 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'chance', 'name': None, 'color': None, 'price': 200, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'park_place', 'color': 'blue', 'price': 350, 'rent': (35, 175, 500, 1100, 1300, 2000), 'house_price': 200},
+    {'kind': 'luxury_tax', 'name': None, 'color': None, 'price': None, 'rent': None, 'house_price': None},
+    {'kind': 'property', 'name': 'boardwalk', 'color': 'blue', 'price': 400, 'rent': (50, 200, 600, 1400, 1700, 2000), 'house_price': 200},
+)
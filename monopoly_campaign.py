@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:   Joshua W. Johnstone
+NAME:     monopoly_campaign.py
+PURPOSE:  Run long simulations of Monopoly that survive being interrupted
+
+A Campaign plays n_games games like monopoly.simulate(), in batches, and
+saves a checkpoint file at intervals: the results of every batch completed
+so far, merged in batch order, and the number of batches done. Game n is
+always seeded with monopoly.game_seed(seed, n), so the number of batches done
+is the whole position of the random streams, and a campaign restarted from
+its checkpoint plays exactly the games that are left. Its final results are
+identical to those of an uninterrupted run, for any number of workers.
+
+Batches are handed to the workers in order and their results are merged in
+that same order; a checkpoint only covers the batches up to the first one
+still running. An interruption loses at most the batches in flight.
+
+Usage:
+    python monopoly_campaign.py run.ckpt --games 10000000 --seed 42
+    python monopoly_campaign.py run.ckpt      resume after an interruption
+
+On resume only --interval, --workers and --backend may be given; the other
+options are those saved in the checkpoint.
+
+Objects:
+    Campaign
+"""
+
+import argparse
+import os
+import pickle
+import random
+import time
+from collections import deque
+
+import monopoly
+
+# Version of the checkpoint format
+CHECKPOINT_VERSION = 1
+
+class Campaign():
+    '''
+    A long simulation of n_games games between 'players', checkpointed to
+    the file 'path'. Start it with Campaign(...).run(); if the process dies,
+    Campaign.resume(path).run() finishes it.
+
+    Parameters
+    ----------
+    players : list of Player
+        The seating for every game. They are copied (see Player.copy) and
+        saved in the checkpoint, with their strategies, which must therefore
+        be picklable.
+    n_games : int
+    path : str
+        Checkpoint file. It must not exist yet; use Campaign.resume() to
+        continue from it.
+    seed : int, optional
+        Base seed of the games (see monopoly.game_seed). A random one is
+        drawn if not given, and saved in the checkpoint.
+    batch_size : int, optional
+        Number of games per batch. Checkpoints are only taken between
+        batches.
+    checkpoint_interval : float, optional
+        Seconds between checkpoints.
+    board : Board, optional
+        Board to play on, as in monopoly.simulate().
+    **game_options
+        Passed on to Game(), e.g. max_rounds or end_rule.
+    '''
+    def __init__(self, players, n_games, path, seed=None, batch_size=1000,
+                 checkpoint_interval=60.0, board=None, **game_options):
+        if os.path.exists(path):
+            raise FileExistsError(f'{path} exists; use Campaign.resume() to '
+                                  'continue it')
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(monopoly.SEED_BITS)
+        monopoly._check_seed(seed, n_games)
+        self.players = [p.copy() for p in players]
+        self.n_games = n_games
+        self.path = path
+        self.seed = seed
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.board = board
+        self.game_options = game_options
+        self.batches_done = 0
+        self.results = monopoly.SimulationResults([p.name for p in players],
+                                                  seed)
+
+    def __repr__(self):
+        return (f'Campaign(path={self.path},'+
+                f'seed={self.seed},'+
+                f'games_done={self.games_done},'+
+                f'n_games={self.n_games})')
+
+    @property
+    def n_batches(self):
+        return -(-self.n_games // self.batch_size)
+
+    @property
+    def games_done(self):
+        return min(self.batches_done * self.batch_size, self.n_games)
+
+    @property
+    def finished(self):
+        return self.batches_done == self.n_batches
+
+    @classmethod
+    def resume(cls, path, checkpoint_interval=None):
+        '''
+        Returns the Campaign saved in the checkpoint file 'path', ready to
+        run() the batches that are left.
+        '''
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f'{path} is not a version {CHECKPOINT_VERSION} '
+                             'campaign checkpoint')
+        campaign = cls.__new__(cls)
+        campaign.__dict__.update(state['campaign'])
+        campaign.path = path
+        if checkpoint_interval is not None:
+            campaign.checkpoint_interval = checkpoint_interval
+        return campaign
+
+    def save(self):
+        '''
+        Writes the checkpoint. The file is replaced atomically, so an
+        interruption while saving leaves the previous checkpoint intact.
+        '''
+        state = {'version': CHECKPOINT_VERSION,
+                 'campaign': {key: value for key, value in vars(self).items()
+                              if not key.startswith('_')}}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _batch(self, k):
+        start = k * self.batch_size
+        return (self.players, self.board, self.seed, start,
+                min(start + self.batch_size, self.n_games), self.game_options)
+
+    def _add(self, results):
+        '''
+        Merges the results of the next batch, and saves a checkpoint if the
+        last one is older than checkpoint_interval.
+        '''
+        self.results.merge(results)
+        self.batches_done += 1
+        if time.monotonic() - self._saved >= self.checkpoint_interval:
+            self.save()
+            self._saved = time.monotonic()
+
+    def run(self, workers=None, backend='process', max_batches=None):
+        '''
+        Plays the batches that are left (at most max_batches of them),
+        saving checkpoints on the way and once more at the end, also if
+        interrupted.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of workers. Defaults to os.cpu_count(). With workers=1
+            the games are played in the calling thread.
+        backend : str, optional
+            'process' or 'thread', as in monopoly.simulate().
+
+        Returns
+        -------
+        results : SimulationResults
+            The results of all the games played so far.
+
+        '''
+        if backend not in monopoly.BACKENDS:
+            raise ValueError(f'Unknown backend: {backend}')
+        if workers is None:
+            workers = os.cpu_count() or 1
+        stop = self.n_batches
+        if max_batches is not None:
+            stop = min(stop, self.batches_done + max_batches)
+        batches = iter(range(self.batches_done, stop))
+        self._saved = time.monotonic()
+        try:
+            if workers == 1:
+                for k in batches:
+                    self._add(monopoly._simulate_batch(*self._batch(k)))
+                return self.results
+
+            with monopoly._executor(backend, workers) as pool:
+                pending = deque()
+                def submit():
+                    k = next(batches, None)
+                    if k is not None:
+                        pending.append(pool.submit(monopoly._simulate_batch,
+                                                   *self._batch(k)))
+                for _ in range(2*workers):
+                    submit()
+                try:
+                    while pending:
+                        results = pending.popleft().result()
+                        submit()
+                        self._add(results)
+                except BaseException:
+                    for future in pending:
+                        future.cancel()
+                    raise
+            return self.results
+        finally:
+            self.save()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run or resume a checkpointed simulation.')
+    parser.add_argument('path', help='checkpoint file; resumed if it exists')
+    # Options that define a new campaign; a resumed one keeps its own. The
+    # defaults are applied below, so that it is known which were given.
+    defaults = {'games': 1000000, 'thresholds': [50, 200, 200, 500],
+                'batch_size': 1000, 'interval': 60.0}
+    parser.add_argument('--games', type=int,
+                        help='number of games (default 1000000)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--thresholds', type=int, nargs='+',
+                        help='cash threshold of each player '
+                             '(default 50 200 200 500)')
+    parser.add_argument('--batch-size', type=int,
+                        help='games per batch (default 1000)')
+    parser.add_argument('--interval', type=float,
+                        help='seconds between checkpoints (default 60, or '
+                             'the one saved in the checkpoint)')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--backend', choices=monopoly.BACKENDS,
+                        default='process')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        fixed = [f'--{name.replace("_", "-")}' 
+                 for name in ('games', 'seed', 'thresholds', 'batch_size')
+                 if getattr(args, name) is not None]
+        if fixed:
+            parser.error(f'{", ".join(fixed)} cannot be changed when '
+                         f'resuming {args.path}')
+        campaign = Campaign.resume(args.path, args.interval)
+        print(f'Resuming {campaign.path} at game {campaign.games_done:,} of '
+              f'{campaign.n_games:,}')
+    else:
+        for name, value in defaults.items():
+            if getattr(args, name) is None:
+                setattr(args, name, value)
+        players = [monopoly.Player(name=f'player{i+1}', cash_threshold=t)
+                   for i, t in enumerate(args.thresholds)]
+        campaign = Campaign(players, args.games, args.path, seed=args.seed,
+                            batch_size=args.batch_size,
+                            checkpoint_interval=args.interval)
+    print(campaign.run(workers=args.workers, backend=args.backend))
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:   Joshua W. Johnstone
+NAME:     monopoly_host.py
+PURPOSE:  Host many live games of Monopoly at once, with some seats played
+          by external agents over a local socket
+
+A GameHost runs on an asyncio event loop. Each game is played by
+monopoly.Game in a thread of the host's pool (games share nothing but the
+BoardSpec, see monopoly.Game), so bot seats, which use the ordinary
+monopoly.Strategy rules, never wait on the loop. A seat given as an agent
+name is played by a RemoteStrategy: at each of its decisions the game's
+thread hands a prompt to the loop and waits for the agent's answer.
+
+Agents connect to the host's socket and speak JSON lines. The first line an
+agent sends names it:
+    {"agent": "alice"}
+The host then sends one prompt per decision, and the agent answers each
+with the same id, in any order:
+    {"id": 7, "decision": "buy", "game": 3, "player": "alice", "cash": 1320,
+     "space": 11, "info": {"space": "St. Charles Place", "price": 140}}
+    {"id": 7, "answer": true}
+
+The decisions, with the answer expected and what the bot rules would do:
+    buy            bool  buy the unowned space landed on (Strategy.buy)
+    build          int   how many houses of info['plan'] to buy, in order
+                         (the houses of Strategy.plan_build)
+    propose_trade  bool  propose the trade in info (Strategy.propose_trade)
+    accept_trade   bool  accept the trade in info (Strategy.accept_trade)
+
+Every decision has a timeout. An agent that answers too late, answers
+something of the wrong type or disconnects gets the bot decision instead, so
+a slow agent only slows down its own games. Each agent has at most
+max_pending prompts in flight and the host plays at most max_games games at
+once; further prompts and games wait for a free slot. DecisionStats keeps
+the latency of every decision, timeouts and errors per kind of decision.
+
+Games are not driven turn by turn on the loop: monopoly.Game.play is
+synchronous, and the strategy hooks that need an agent's answer are called
+from deep inside a turn, so each game runs whole in a thread, and the hooks
+block that thread on the loop. The cost is that every running game holds an
+OS thread of the pool (max_games of them) for its whole length, blocked
+while an agent decides, so hosting hundreds of live games means hundreds of
+threads, and the number of games played at once is bounded by how many
+threads the process can afford, not by the loop. A game's thread waits at
+most timeout + loop_timeout for the loop to return a decision; if the loop
+is stopped or stuck, the game fails with a RuntimeError instead of hanging.
+Failed games raise from GameHost.play and are also kept in
+GameHost.failures, which is the only trace of games still running when the
+loop stops.
+
+Objects:
+    DecisionStats
+    AgentConnection
+    RemoteStrategy (monopoly.Strategy)
+    GameHost
+
+Functions:
+    run_agent
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import monopoly
+
+DECISIONS = ('buy', 'build', 'propose_trade', 'accept_trade')
+
+class DecisionStats():
+    '''
+    Latencies (in seconds) of one kind of decision, with the number of
+    decisions that timed out or failed and got the bot decision instead.
+    '''
+    def __init__(self):
+        self.latencies = []
+        self.timeouts = 0
+        self.errors = 0
+
+    def __repr__(self):
+        return (f'DecisionStats(count={self.count},'+
+                f'timeouts={self.timeouts},'+
+                f'errors={self.errors})')
+
+    def __str__(self):
+        if not self.count:
+            return 'no decisions'
+        ms = 1000
+        return (f'{self.count:7d} decisions  mean {self.mean*ms:7.2f} ms  '
+                f'p50 {self.percentile(50)*ms:7.2f} ms  '
+                f'p95 {self.percentile(95)*ms:7.2f} ms  '
+                f'max {max(self.latencies)*ms:7.2f} ms  '
+                f'timeouts {self.timeouts}  errors {self.errors}')
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    @property
+    def mean(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def percentile(self, q):
+        '''
+        Returns the q-th percentile (0-100) of the latencies, by the nearest
+        rank.
+        '''
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, -(-q * len(ordered) // 100))
+        return ordered[min(rank, len(ordered)) - 1]
+
+class AgentConnection():
+    '''
+    One connected agent. Prompts are written as JSON lines, and a reader
+    task matches the answers to the prompts waiting for them by id. At most
+    max_pending prompts are in flight at once; ask() waits for a free slot.
+    '''
+    def __init__(self, name, reader, writer, max_pending=32):
+        self.name = name
+        self.closed = False
+        self._reader = reader
+        self._writer = writer
+        self._slots = asyncio.Semaphore(max_pending)
+        self._ids = itertools.count()
+        self._pending = {}
+        self._task = asyncio.get_running_loop().create_task(self._read())
+
+    def __repr__(self):
+        return (f'AgentConnection(name={self.name},'+
+                f'pending={len(self._pending)},'+
+                f'closed={self.closed})')
+
+    async def ask(self, prompt):
+        '''
+        Sends 'prompt' (a dict) and returns the agent's answer. Raises
+        ConnectionError if the agent is or gets disconnected. Cancelling the
+        call (e.g. on a timeout) frees its slot; a late answer is ignored.
+        '''
+        async with self._slots:
+            if self.closed:
+                raise ConnectionError(f'Agent {self.name} is disconnected')
+            id_ = next(self._ids)
+            answer = asyncio.get_running_loop().create_future()
+            self._pending[id_] = answer
+            try:
+                line = json.dumps({'id': id_, **prompt}) + '\n'
+                self._writer.write(line.encode())
+                await self._writer.drain()
+                return await answer
+            finally:
+                del self._pending[id_]
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    answer = self._pending.get(message['id'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if answer is not None and not answer.done():
+                    answer.set_result(message.get('answer'))
+        except ConnectionError:
+            pass
+        finally:
+            self.closed = True
+            for answer in self._pending.values():
+                if not answer.done():
+                    answer.set_exception(
+                        ConnectionError(f'Agent {self.name} disconnected'))
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._task
+
+class RemoteStrategy(monopoly.Strategy):
+    '''
+    Strategy of a seat played by a connected agent, in one game of a
+    GameHost. Each hook works out what the default rules would do, asks the
+    agent (see GameHost.decide) and falls back on the default if the agent
+    doesn't answer in time. Its hooks are called from the game's thread, 
+    which raises RuntimeError if the host's loop is gone or doesn't return
+    a decision within timeout + loop_timeout.
+    '''
+    def __init__(self, host, agent, game_id, name=None):
+        super().__init__(name=name or f'Remote({agent})')
+        self.host = host
+        self.agent = agent
+        self.game_id = game_id
+
+    def _ask(self, player, decision, info, default):
+        prompt = {'decision': decision, 'game': self.game_id,
+                  'player': player.name, 'cash': player.cash,
+                  'space': player.space, 'info': info}
+        host = self.host
+        coroutine = host.decide(self.agent, prompt, default)
+        try:
+            future = asyncio.run_coroutine_threadsafe(coroutine, host.loop)
+        except RuntimeError:
+            coroutine.close()
+            raise RuntimeError(f'Game {self.game_id}: the host\'s event loop '
+                               'is closed')
+        try:
+            return future.result(host.timeout + host.loop_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise RuntimeError(f'Game {self.game_id}: no {decision} decision '
+                               f'from the host\'s event loop in '
+                               f'{host.timeout + host.loop_timeout} s')
+        except concurrent.futures.CancelledError:
+            raise RuntimeError(f'Game {self.game_id}: the {decision} decision '
+                               'was cancelled, the host\'s event loop stopped')
+
+    def buy(self, player, prop):
+        return self._ask(player, 'buy',
+                         {'space': prop.name, 'price': prop.price},
+                         super().buy(player, prop))
+
+    def build(self, player):
+        plan = self.plan_build(player)
+        if plan:
+            n = self._ask(player, 'build', {'plan': [p.name for p in plan]},
+                          len(plan))
+            plan = plan[:max(0, n)]
+        if plan:
+            player.buy_houses(plan)
+
+    def propose_trade(self, game, buyer):
+        # A proposal the agent turns down is not offered again until a 
+        # property changes hands (see monopoly.Game.find_trades)
+        trade = super().propose_trade(game, buyer)
+        if trade is None:
+            return None
+        seller, buy, sell = trade
+        info = {'seller': seller.name, 'buy': buy.name, 'sell': sell.name}
+        if self._ask(buyer, 'propose_trade', info, True):
+            return trade
+        return None
+
+    def accept_trade(self, player, other, give, get):
+        info = {'buyer': other.name, 'give': give.name, 'get': get.name}
+        return self._ask(player, 'accept_trade', info,
+                         super().accept_trade(player, other, give, get))
+
+class GameHost():
+    '''
+    Plays games with a mix of bot seats and agent seats on an asyncio event
+    loop (see the module docstring). Use it inside a running loop:
+
+        host = GameHost(timeout=0.5)
+        address = await host.start()
+        await host.agent('alice')      # wait for the agent to connect
+        records = await asyncio.gather(
+            *(host.play(['alice', bot, bot, bot], seed=n) for n in range(100)))
+        await host.close()
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Seconds an agent has to answer a prompt, including the wait for a
+        free slot.
+    max_games : int, optional
+        Number of games played at once, each in its own thread of the pool
+        for its whole length (see the module docstring).
+    max_pending : int, optional
+        Number of prompts each agent has in flight at once.
+    loop_timeout : float, optional
+        Seconds a game's thread waits for a decision beyond 'timeout', for a
+        busy loop, before the game fails.
+    board : Board, optional
+        Every game gets a new Board with the same spec.
+    **game_options
+        Passed on to monopoly.Game(), e.g. max_rounds or end_rule.
+    '''
+    def __init__(self, timeout=1.0, max_games=100, max_pending=32, 
+                 loop_timeout=10.0, board=None, **game_options):
+        self.timeout = timeout
+        self.max_games = max_games
+        self.max_pending = max_pending
+        self.loop_timeout = loop_timeout
+        self.spec = board.spec if board is not None else monopoly.board_spec()
+        self.game_options = game_options
+        self.stats = {decision: DecisionStats() for decision in DECISIONS}
+        self.agents = {}
+        self.failures = []
+        self.loop = None
+        self._server = None
+        self._games = None
+        self._game_ids = itertools.count()
+        self._waiting = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_games)
+
+    def __repr__(self):
+        return (f'GameHost(timeout={self.timeout},'+
+                f'max_games={self.max_games},'+
+                f'agents={list(self.agents)})')
+
+    def __str__(self):
+        width = max(len(decision) for decision in DECISIONS)
+        return '\n'.join(f'{decision:<{width}}  {stats}'
+                         for decision, stats in self.stats.items())
+
+    async def start(self, host='127.0.0.1', port=0):
+        '''
+        Starts listening for agents. Returns the (host, port) address, port
+        0 picking a free one.
+        '''
+        self.loop = asyncio.get_running_loop()
+        self._games = asyncio.Semaphore(self.max_games)
+        self._server = await asyncio.start_server(self._connect, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    def _check_started(self):
+        if self.loop is None:
+            raise RuntimeError('GameHost is not started; await '
+                               'GameHost.start() first')
+
+    async def close(self):
+        '''
+        Stops listening and disconnects every agent. Games still running
+        finish with bot decisions, as long as the loop keeps running.
+        '''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for connection in list(self.agents.values()):
+            await connection.close()
+        self._pool.shutdown(wait=False)
+
+    async def _connect(self, reader, writer):
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(),
+                                                      self.timeout))
+            name = hello['agent']
+        except (asyncio.TimeoutError, ValueError, KeyError, TypeError):
+            writer.close()
+            return
+        old = self.agents.get(name)
+        if old is not None:
+            await old.close()
+        connection = AgentConnection(name, reader, writer, self.max_pending)
+        self.agents[name] = connection
+        waiting = self._waiting.pop(name, None)
+        if waiting is not None:
+            waiting.set_result(connection)
+
+    async def agent(self, name):
+        '''
+        Returns the AgentConnection of agent 'name', waiting for it to
+        connect if it hasn't yet.
+        '''
+        if name in self.agents:
+            return self.agents[name]
+        self._check_started()
+        if name not in self._waiting:
+            self._waiting[name] = self.loop.create_future()
+        return await asyncio.shield(self._waiting[name])
+
+    async def decide(self, agent, prompt, default):
+        '''
+        Asks agent 'agent' to make the decision in 'prompt' and returns its
+        answer, or 'default' if the agent times out, is not connected, or
+        answers with a value of another type than 'default'. Records the
+        latency in GameHost.stats.
+        '''
+        stats = self.stats[prompt['decision']]
+        start = time.perf_counter()
+        try:
+            connection = self.agents[agent]
+            answer = await asyncio.wait_for(connection.ask(prompt), self.timeout)
+            if type(answer) is not type(default):
+                raise TypeError(f'Bad answer from agent {agent}: {answer!r}')
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            answer = default
+        except (KeyError, ConnectionError, TypeError):
+            stats.errors += 1
+            answer = default
+        stats.latencies.append(time.perf_counter() - start)
+        return answer
+
+    async def play(self, seats, seed=None, n=None):
+        '''
+        Plays one game and returns its GameRecord. Waits for a free slot if
+        max_games games are already running.
+
+        Parameters
+        ----------
+        seats : list of Player or str
+            One entry per seat: a Player (copied, see Player.copy) is a bot,
+            a string the name of the agent playing that seat.
+        seed : int, optional
+            Seed of the game (see Game.reset).
+        n : int, optional
+            Number of the game, sent with every prompt as 'game'. By default
+            games are numbered in the order they start.
+
+        Returns
+        -------
+        record : GameRecord
+
+        '''
+        self._check_started()
+        async with self._games:
+            if n is None:
+                n = next(self._game_ids)
+            players = []
+            for seat in seats:
+                if isinstance(seat, str):
+                    strategy = RemoteStrategy(self, seat, n)
+                    players.append(monopoly.Player(name=seat, strategy=strategy))
+                else:
+                    players.append(seat.copy())
+            game = monopoly.Game(board=monopoly.Board(self.spec),
+                                 players=players, **self.game_options)
+            await self.loop.run_in_executor(self._pool, self._play, game,
+                                            seed, n)
+            return game.to_record(n)
+
+    def _play(self, game, seed, n):
+        '''
+        Plays 'game' in a thread of the pool, keeping any failure (with the
+        game's number) in GameHost.failures before raising it.
+        '''
+        try:
+            game.play(seed)
+        except BaseException as error:
+            self.failures.append((n, error))
+            raise
+
+async def run_agent(name, decide, host='127.0.0.1', port=None):
+    '''
+    Connects to a GameHost as agent 'name' and answers its prompts with
+    decide(prompt), until the host disconnects. 'decide' may be a plain
+    function or a coroutine function; each prompt is answered in its own
+    task, so a slow answer doesn't hold up the others.
+    '''
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({'agent': name}) + '\n').encode())
+    await writer.drain()
+    tasks = set()
+
+    async def answer(prompt):
+        result = decide(prompt)
+        if asyncio.iscoroutine(result):
+            result = await result
+        writer.write((json.dumps({'id': prompt['id'], 'answer': result})
+                      + '\n').encode())
+        await writer.drain()
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            task = asyncio.get_running_loop().create_task(answer(json.loads(line)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:   Joshua W. Johnstone
+NAME:     monopoly_markov.py
+PURPOSE:  Landing probabilities and expected rents of a Monopoly board,
+          computed exactly with a Markov chain instead of by simulation
+
+The chain follows the movement rules of monopoly.Player.take_turn: two dice,
+rolling again on doubles, jail on the third double, the go_to_jail space, and
+leaving jail on a double or after the third failed attempt. Its states are
+the positions at the start of a turn: the 40 spaces (space 10 being 'just
+visiting') plus one state per turn already spent in jail. Chance and
+Community Chest cards move the player as in monopoly.Player.draw_card, each
+card being drawn with probability 1/16; the memory of a real deck and the 
+get out of jail free cards (kept by players) are not modelled.
+
+Objects:
+    MarkovChain
+
+Functions:
+    markov_chain
+"""
+
+import threading
+
+import numpy as np
+import monopoly
+
+# Probability of each (dice1, dice2) outcome
+_ROLLS = [(d1, d2, 1/36) for d1 in range(1, 7) for d2 in range(1, 7)]
+
+# Rolling this many doubles in one turn sends the player to jail
+_MAX_DOUBLES = 3
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+class MarkovChain():
+    '''
+    The turn-to-turn Markov chain of one player moving around a board.
+
+    States 0-39 are the board spaces; state 40+t is 'in jail, t failed
+    attempts so far' for t = 0, 1, 2.
+
+    Attributes
+    ----------
+    transitions : (43, 43) array
+        transitions[i, j] is the probability that a turn starting in state i
+        ends in state j.
+    landings : (43, 40) array
+        landings[i, s] is the expected number of times a turn starting in
+        state i lands on space s (a turn can land several times on doubles).
+    stationary : (43,) array
+        Long-run probability of starting a turn in each state.
+    landing_probabilities : (40,) array
+        Long-run expected number of landings on each space per turn.
+    card_probabilities, card_multiples : (40,) array
+        The part of landing_probabilities due to 'nearest railroad' and 
+        'nearest utility' cards, and the same landings weighted by the 
+        card's multiplier (of the rent, resp. the roll).
+
+    '''
+    JAIL = 10
+    JAIL_STATES = 3
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.n_spaces = n = len(spec.kinds)
+        self.n_states = n + self.JAIL_STATES
+        self.go_to_jail = {i for i, kind in enumerate(spec.kinds)
+                           if kind == 'go_to_jail'}
+        self.nearest = {kind: monopoly._nearest_table(spec.kinds, kind)
+                        for kind in ('railroad', 'utility')}
+        self.arrivals, self.visits, self.card_visits = self._arrival_matrices()
+        
+        # Moves of one roll, split into doubles and other rolls
+        doubles = np.zeros((n, n))
+        others = np.zeros((n, n))
+        for d1, d2, p in _ROLLS:
+            moves = doubles if d1 == d2 else others
+            for i in range(n):
+                moves[i, (i + d1 + d2) % n] += p
+                
+        self.transitions = np.zeros((self.n_states, self.n_states))
+        self.landings = np.zeros((self.n_states, n))
+        self.card_landings = np.zeros((2, self.n_states, n))
+        self._free_turns(doubles, others)
+        self._jail_turns(doubles, others)
+        self.stationary = self._solve()
+        self.landing_probabilities = self.stationary @ self.landings
+        self.card_probabilities, self.card_multiples = self.stationary @ self.card_landings
+
+    def __repr__(self):
+        return f'MarkovChain(n_states={self.n_states})'
+
+    def _jail_state(self, turns_in_jail=0):
+        return self.n_spaces + turns_in_jail
+    
+    def _card_moves(self, space):
+        '''
+        Returns the (destination, probability, multiplier) of each card drawn
+        on 'space', with destination None for jail and multiplier 0 but for 
+        the 'nearest railroad/utility' cards, or None if no card is drawn 
+        there.
+        '''
+        kind = self.spec.kinds[space]
+        if kind == 'chance':
+            cards = monopoly.ChanceDeck.CARDS
+        elif kind == 'community_chest':
+            cards = monopoly.CommunityChest.CARDS
+        else:
+            return None
+        moves = []
+        for text, action, value in cards:
+            multiplier = 0
+            if action == 'advance':
+                to = value
+            elif action in self.nearest:
+                to = self.nearest[action][space]
+                multiplier = value
+            elif action == 'back':
+                to = (space - value) % self.n_spaces
+            elif action == 'jail':
+                to = None
+            else:
+                to = space
+            moves.append((to, 1 / len(cards), multiplier))
+        return moves
+    
+    def _arrive(self, space, prob, arrivals, visits, card_visits, multiplier=0):
+        '''
+        Follows a landing on 'space', reached with probability 'prob', to 
+        where the player ends up (column n_spaces of 'arrivals' being jail),
+        recording every landing on the way in 'visits'. Landings sent by a 
+        card with a rent 'multiplier' are also recorded in card_visits[0], 
+        and weighted by it in card_visits[1].
+        '''
+        visits[space] += prob
+        if multiplier:
+            card_visits[0, space] += prob
+            card_visits[1, space] += prob * multiplier
+        if space in self.go_to_jail:
+            arrivals[self.n_spaces] += prob
+            return
+        moves = self._card_moves(space)
+        if moves is None:
+            arrivals[space] += prob
+            return
+        for to, p, multiplier in moves:
+            if to is None:
+                arrivals[self.n_spaces] += prob * p
+            elif to == space:
+                arrivals[space] += prob * p
+            else:
+                self._arrive(to, prob * p, arrivals, visits, card_visits, 
+                             multiplier)
+
+    def _arrival_matrices(self):
+        '''
+        Returns 'arrivals', where arrivals[s, e] is the probability that 
+        landing on space s ends on space e (e = n_spaces: in jail) after any
+        card, 'visits', where visits[s, e] is the expected number of 
+        landings on e that it counts (including s itself), and 'card_visits',
+        the same for the landings sent by a 'nearest' card (card_visits[0]) 
+        and weighted by its multiplier (card_visits[1]).
+        '''
+        n = self.n_spaces
+        arrivals = np.zeros((n, n + 1))
+        visits = np.zeros((n, n))
+        card_visits = np.zeros((2, n, n))
+        for space in range(n):
+            self._arrive(space, 1.0, arrivals[space], visits[space], 
+                         card_visits[:, space])
+        return arrivals, visits, card_visits
+    
+    def _land(self, starts, moved):
+        '''
+        Records the landings of turns from the states 'starts' whose player 
+        is now at the positions distributed as 'moved' (one row per start).
+        Returns the distribution of where they end up, jail last.
+        '''
+        self.landings[starts] += moved @ self.visits
+        self.card_landings[:, starts] += moved @ self.card_visits
+        return moved @ self.arrivals
+
+    def _free_turns(self, doubles, others):
+        '''
+        Turns that start on a space: follows the distribution of the position
+        over the successive rolls of the turn, for all 40 starting spaces at
+        once. Doubles roll again, and the third double goes to jail.
+        '''
+        n = self.n_spaces
+        jail = self._jail_state()
+        starts = np.arange(n)
+        position = np.eye(n)
+        for rolled in range(_MAX_DOUBLES):
+            end = self._land(starts, position @ others)
+            self.transitions[starts, :n] += end[:, :n]
+            self.transitions[starts, jail] += end[:, n]
+            if rolled + 1 == _MAX_DOUBLES:
+                self.transitions[starts, jail] += position @ doubles.sum(axis=1)
+            else:
+                end = self._land(starts, position @ doubles)
+                self.transitions[starts, jail] += end[:, n]
+                position = end[:, :n]
+
+    def _jail_turns(self, doubles, others):
+        '''
+        A turn in jail: leave on a double or on the third attempt, moving by
+        the roll without rolling again. Otherwise stay for another turn.
+        '''
+        n = self.n_spaces
+        at_jail = np.zeros((1, n))
+        at_jail[0, self.JAIL] = 1.0
+        for turns_in_jail in range(self.JAIL_STATES):
+            start = self._jail_state(turns_in_jail)
+            last = turns_in_jail + 1 == self.JAIL_STATES
+            leave = doubles + others if last else doubles
+            end = self._land([start], at_jail @ leave)[0]
+            self.transitions[start, :n] += end[:n]
+            self.transitions[start, self._jail_state()] += end[n]
+            if not last:
+                stay = (at_jail @ others).sum()
+                self.transitions[start, self._jail_state(turns_in_jail + 1)] += stay
+
+    def _solve(self):
+        '''
+        Solves pi P = pi with sum(pi) = 1 by replacing one balance equation
+        with the normalization.
+        '''
+        a = self.transitions.T - np.eye(self.n_states)
+        a[-1] = 1.0
+        b = np.zeros(self.n_states)
+        b[-1] = 1.0
+        return np.linalg.solve(a, b)
+
+    @property
+    def jail_probability(self):
+        '''
+        Returns the long-run probability of starting a turn in jail.
+        '''
+        return self.stationary[self.n_spaces:].sum()
+
+    def rent_levels(self, index):
+        '''
+        Returns the rent charged at each level of development of the space at
+        'index', as in Player.pay_rent, or an empty tuple for spaces without
+        rent. The levels are:
+            property: unimproved, unimproved in a monopoly (twice the rent),
+                      then 1-5 houses, read from rent_data
+            railroad: 1-4 railroads owned
+            utility:  1-2 utilities owned, with the expected roll of 7
+        These are the rents of an ordinary landing; expected_rent() also 
+        counts the landings sent by a 'nearest railroad' card, which pay 
+        twice the rent, and by a 'nearest utility' card, which pay ten times
+        the roll.
+        '''
+        kind = self.spec.kinds[index]
+        if kind == 'property':
+            rents = self.spec.rents[index]
+            return (rents[0], 2 * rents[0], *rents[1:])
+        elif kind == 'railroad':
+            return tuple(50 * n for n in range(1, 5))
+        elif kind == 'utility':
+            return (4 * 7, 10 * 7)
+        return ()
+
+    def expected_rent(self):
+        '''
+        Returns the expected rent an owner collects from one opponent turn,
+        for every ownable space at every level of development (see
+        rent_levels()). Multiply by the number of opponents for the rent per
+        round.
+
+        Returns
+        -------
+        rents : dict
+            Maps space name to a tuple of expected rents, one per level.
+
+        '''
+        rents = {}
+        for index in range(self.n_spaces):
+            levels = self.rent_levels(index)
+            if levels:
+                prob = self.landing_probabilities[index]
+                # Card landings pay the card's multiple of the rent, resp. 
+                # of the roll
+                by_card = self.card_probabilities[index]
+                multiple = self.card_multiples[index]
+                if self.spec.kinds[index] == 'utility':
+                    rents[self.spec.names[index]] = tuple(
+                        float((prob - by_card) * r + multiple * 7) for r in levels)
+                else:
+                    rents[self.spec.names[index]] = tuple(
+                        float((prob - by_card) * r + multiple * r) for r in levels)
+        return rents
+
+    def ranking(self, level=0):
+        '''
+        Returns (name, expected rent) pairs sorted from most to least
+        profitable at the given level of development (see rent_levels(): 
+        for properties, level k+1 is k houses). Spaces without that level 
+        are left out.
+        '''
+        pairs = [(name, rents[level]) for name, rents in self.expected_rent().items()
+                 if level < len(rents)]
+        return sorted(pairs, key=lambda pair: pair[1], reverse=True)
+
+def markov_chain(spec=None):
+    '''
+    Returns the MarkovChain of a BoardSpec (by default the shared spec from
+    monopoly.board_spec()). Each spec is only solved once per process, even
+    when several threads ask for it at once.
+    '''
+    if spec is None:
+        spec = monopoly.board_spec()
+    chain = _chains.get(spec)
+    if chain is None:
+        with _chains_lock:
+            chain = _chains.get(spec)
+            if chain is None:
+                chain = _chains[spec] = MarkovChain(spec)
+    return chain
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Round trips of iter_games() records through write_games() and read_games().
+
+"""
+
+import pytest
+
+import monopoly
+
+pa = pytest.importorskip('pyarrow')
+
+
+def make_players():
+    return [monopoly.Player(name='Josh', cash_threshold=50),
+            monopoly.Player(name='Austin'),
+            monopoly.Player(name='Zander'),
+            monopoly.Player(name='Scott', cash_threshold=500)]
+
+
+@pytest.mark.parametrize('ext', ['.arrow', '.feather', '.parquet'])
+def test_round_trip(tmp_path, ext):
+    records = list(monopoly.iter_games(make_players(), n_games=20, seed=7))
+    path = str(tmp_path / f'games{ext}')
+    # A small chunk size writes several record batches / row groups
+    assert monopoly.write_games(records, path, chunk_size=8) == len(records)
+    table = monopoly.read_games(path)
+    assert table.num_rows == len(records)
+    assert table.column_names == monopoly._game_columns(4)
+    rows = list(zip(*(column.to_pylist() for column in table.columns)))
+    assert rows == [record.row() for record in records]
+
+
+def test_random_seed():
+    records = list(monopoly.iter_games(make_players(), n_games=5))
+    assert [record.n for record in records] == list(range(5))
+    # Every game's seed derives from one base seed, so a game can be replayed
+    game = monopoly.Game(players=make_players())
+    game.play(seed=records[3].seed)
+    assert (game.rounds, game.outcome) == (records[3].rounds, records[3].outcome)